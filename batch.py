@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import dataclasses
+import pathlib
+import typing
+
+
+# the roots of the repos listed in a manifest, one per line and relative to the manifest, with `#` comments
+def read_manifest(path: pathlib.Path) -> list[pathlib.Path]:
+	roots = []
+	for line in path.read_text('utf8').splitlines():
+		line = line.split('#', 1)[0].strip()
+		if line:
+			roots.append(path.parent / line)
+	return roots
+
+
+# what a run did in one repo of a batch
+@dataclasses.dataclass
+class RepoSummary:
+	root: pathlib.Path
+	files: int = 0
+	parsed_files: int = 0
+	# the args which were renamed, deleted, annotated or whose redundant docstring type was deleted
+	fixed_args: int = 0
+	marked_args: int = 0
+	modified_files: int = 0
+	failed_files: int = 0
+	seconds: float = 0
+	succeeded: bool = False
+	# the error which stopped the run before the end
+	error: typing.Optional[str] = None
+
+
+SUMMARY_COLUMNS = ('repo', 'files', 'parsed', 'fixed args', 'marked args', 'modified', 'failed', 'time', 'result')
+
+
+# a table with a row for each repo of a batch and the totals
+def format_summary(summaries: list[RepoSummary], seconds: float) -> str:
+	rows = [
+		(
+			str(summary.root), summary.files, summary.parsed_files, summary.fixed_args, summary.marked_args,
+			summary.modified_files, summary.failed_files, f'{summary.seconds:.2f}s',
+			'ok' if summary.succeeded else summary.error or 'failed',
+		)
+		for summary in summaries
+	]
+	failed_repos = sum(not summary.succeeded for summary in summaries)
+	rows.append((
+		f'{len(summaries)} repos', *(sum(row[i] for row in rows) for i in range(1, 7)), f'{seconds:.2f}s',
+		f'{failed_repos} failed' if failed_repos else 'ok',
+	))
+	rows = [SUMMARY_COLUMNS, *(tuple(map(str, row)) for row in rows)]
+	# the names and the results are aligned to the left, the numbers to the right
+	widths = [max(len(row[i]) for row in rows) for i in range(len(SUMMARY_COLUMNS))]
+	lines = [
+		'  '.join(value.ljust(width) if i in (0, len(row) - 1) else value.rjust(width) for i, (value, width) in enumerate(zip(row, widths))).rstrip()
+		for row in rows
+	]
+	lines.insert(1, '  '.join('-' * width for width in widths))
+	lines.insert(len(lines) - 1, lines[1])
+	return '\n'.join(lines)
@@ -0,0 +1,37 @@
+# compares applying modifications one by one (the previous implementation) to applying them in a single pass
+import pathlib
+import random
+import sys
+import timeit
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+from edits import Edit
+from utils import apply_modifications
+
+
+LINES = 50_000
+EDITS = 10_000
+REPEAT = 3
+
+def apply_modifications_one_by_one(contents: str, modifications: list[Edit]) -> str:
+	for modification in reversed(modifications):
+		contents = contents[:modification.start] + modification.replacement + contents[modification.stop:]
+	return contents
+
+def main():
+	rng = random.Random(0)
+	contents = ''.join(f'    def method_{i}(self, arg_{i}, other_{i}=None):\n' for i in range(LINES))
+	starts = sorted(rng.sample(range(len(contents) - 10), EDITS))
+	# make sure the modifications don't overlap
+	modifications = [Edit(start, min(start + rng.randint(0, 5), next_start), ': float') for start, next_start in zip(starts, starts[1:] + [len(contents)])]
+
+	assert apply_modifications(contents, modifications) == apply_modifications_one_by_one(contents, modifications)
+
+	print(f'{len(contents)} chars, {len(modifications)} modifications')
+	for func in (apply_modifications_one_by_one, apply_modifications):
+		seconds = min(timeit.repeat(lambda: func(contents, modifications), number=1, repeat=REPEAT))
+		print(f'\t{func.__name__}: {seconds * 1000:.1f}ms')
+
+
+if __name__ == '__main__':
+	main()
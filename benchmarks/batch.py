@@ -0,0 +1,60 @@
+# compares fixing forks of a repo with a process for each of them (the previous implementation) to a single batch,
+# at an increasing number of forks which share most of their files
+import argparse
+import pathlib
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+from corpus import CorpusConfig, generate
+
+SCRIPT = pathlib.Path(__file__).parent.parent / 'fix-params.py'
+
+
+# copies of the corpus where every `changed_every`-th file comes from another corpus, different in each fork
+def generate_forks(root: pathlib.Path, config: CorpusConfig, forks: int, changed_every: int) -> list[pathlib.Path]:
+	generate(root / 'base', config)
+	roots = []
+	for i in range(forks):
+		fork = root / f'fork{i}'
+		shutil.copytree(root / 'base', fork)
+		generate(root / 'changes', CorpusConfig(files=config.files, seed=i + 1))
+		for j, path in enumerate(sorted((root / 'changes').glob('**/*.py'))):
+			if j % changed_every == i % changed_every:
+				shutil.copy(path, fork / path.relative_to(root / 'changes'))
+		shutil.rmtree(root / 'changes')
+		roots.append(fork)
+	return roots
+
+
+def fix(*args) -> None:
+	# without the cache so every file is parsed at least once, and without writing so the forks can be fixed again
+	subprocess.run([sys.executable, SCRIPT, *args, '--no-cache', '--dry-run'], check=True, stdout=subprocess.DEVNULL)
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--files', type=int, default=CorpusConfig.files * 10)
+	parser.add_argument('--forks', type=int, nargs='+', default=[1, 2, 4, 8])
+	parser.add_argument('--changed-every', type=int, default=10, help='every n-th file of a fork differs from the other forks')
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as root:
+		roots = generate_forks(pathlib.Path(root), CorpusConfig(files=args.files), max(args.forks), args.changed_every)
+		print(f'{args.files} files in each fork, {args.files // args.changed_every} of them differ from the other forks')
+		for forks in args.forks:
+			start = time.perf_counter()
+			for fork in roots[:forks]:
+				fix(fork)
+			process_seconds = time.perf_counter() - start
+			start = time.perf_counter()
+			fix(*roots[:forks])
+			batch_seconds = time.perf_counter() - start
+			print(f'\t{forks} forks: {"process per fork":<16} {process_seconds * 1000:8.1f}ms, {"batch":<6} {batch_seconds * 1000:8.1f}ms')
+
+
+if __name__ == '__main__':
+	main()
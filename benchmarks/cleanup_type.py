@@ -0,0 +1,62 @@
+# replays all the types in a manim repo through the original cleanups and through `cleanup_type`, verifying the results are identical
+import argparse
+import functools
+import pathlib
+import re
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+from discovery import SourceFinder
+from file import load_files
+from utils import cleanup_type, remove_suffix
+
+
+# the cleanups as they were before precompiling and memoizing them
+ORIGINAL_TYPE_CLEANUPS = [
+	lambda s: remove_suffix(s, ', optional'),
+	lambda s: remove_suffix(s, ' | None'),
+	lambda s: re.sub(r'^Optional\[(.+)\]$', r'\1', s),
+	lambda s: re.sub(r'^\(([^)]+)\)$', r'\1', s),
+	lambda s: re.sub(r"^'([^)]+)'$", r'\1', s),
+	lambda s: re.sub(r':?\bclass ?:`~?\.?([^`]+)`', r'\1', s),
+	lambda s: s.replace('numpy', 'np').replace('np.array', 'np.ndarray'),
+	lambda s: re.sub(r'\btyping\.', '', s),
+	lambda s: re.sub(r'\b(List|Dict|Tuple|Type)\b', lambda m: m.group().lower(), s),
+	lambda s: re.sub(r'\bstring\b', 'str', s),
+	lambda s: re.sub(r'\bBoolean\b', 'bool', s),
+	lambda s: s.replace('Callable[[...]', 'Callable[...'),
+	lambda s: re.sub(r'Callable\[(\w+),', lambda m: f'Callable[[{m.group(1)}],', s),
+	lambda s: re.sub(r'\b(list\[\w+), \.\.\.\]', r'\1]', s),
+	lambda s: s.replace(' or ', ', '),
+	lambda s: re.sub(r' ?\| ?', ' | ', s),
+	lambda s: re.sub(r'^([\w., ]+)$', lambda m: ' | '.join(map(str.strip, m.group(1).split(','))), s),
+	lambda s: re.sub(r'\bUnion\[([\w., ]+)\]', lambda m: ' | '.join(map(str.strip, m.group(1).split(','))), s),
+	lambda s: s.replace('float | int', 'float').replace('int | float', 'float'),
+]
+
+original_cleanup_type = lambda s: functools.reduce(lambda t, c: c(t), ORIGINAL_TYPE_CLEANUPS, s)
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('manim_root', type=pathlib.Path)
+	args = parser.parse_args()
+
+	files = load_files(SourceFinder(args.manim_root).find(), args.manim_root)
+	funcs = [func for file in files for func in file.functions]
+	# every type that `cleanup_type` is called on
+	types = [arg.type for f in funcs for arg in [*f.doc_args.values(), *f.func_args.values()] if arg.type]
+	print(f'{len(types)} types, {len(set(types))} unique')
+
+	start = time.perf_counter()
+	expected = [original_cleanup_type(t) for t in types]
+	print(f'\toriginal: {(time.perf_counter() - start) * 1000:.1f}ms')
+	start = time.perf_counter()
+	results = [cleanup_type(t) for t in types]
+	print(f'\tprecompiled and memoized: {(time.perf_counter() - start) * 1000:.1f}ms')
+	assert results == expected, [(t, e, r) for t, e, r in zip(types, expected, results) if e != r][:10]
+	print(f'\t{cleanup_type.cache_info()}')
+
+
+if __name__ == '__main__':
+	main()
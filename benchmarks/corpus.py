@@ -0,0 +1,181 @@
+# generates a deterministic synthetic tree which looks like manim to the script
+import argparse
+import dataclasses
+import pathlib
+import random
+import sys
+
+
+# the docstring types, covering the syntaxes handled by `TYPE_CLEANUPS`
+TYPES = [
+	'float', 'int', 'str', 'bool', 'np.ndarray', 'numpy.array', 'Sequence[float]', 'List[int]', 'Optional[float]',
+	'float or int', 'int, str', 'Union[int, str]', 'string', 'Boolean', 'Callable[int, float]', '(float, float)',
+	'typing.Iterable[float]', 'Dict[str, int]', 'Tuple[float, ...]', "'Sequence[int]'",
+]
+# the types which are also used as annotations, in which case the docstring type must match
+ANNOTATED_TYPES = ['float', 'int', 'str', 'Sequence[float]']
+
+
+@dataclasses.dataclass
+class CorpusConfig:
+	files: int = 20
+	funcs_per_file: int = 6
+	max_params_per_func: int = 5
+	# every n-th file has CRLF newlines
+	crlf_every: int = 11
+	# every n-th file has non-ascii characters
+	non_ascii_every: int = 13
+	# every n-th file has no parameters in its docstrings, like most files of manim
+	plain_every: int = 0
+	seed: int = 0
+
+
+# a file with classes and imports but nothing to fix
+def generate_plain_file(rng: random.Random, config: CorpusConfig, index: int, classes: list[str]) -> str:
+	base = rng.randrange(config.files)
+	# a module of the same package, which is imported relatively
+	sibling = rng.randrange(index % 7, config.files, 7)
+	lines = [
+		'from __future__ import annotations',
+		'',
+		'import typing',
+		'',
+		'import numpy as np',
+		'',
+		f'from manim.package{base % 7}.module{base} import {classes[base]}',
+		'',
+		'if typing.TYPE_CHECKING:',
+		f'    from .module{sibling} import {classes[sibling]}',
+		'',
+		'',
+		f'class {classes[index]}({classes[base]}):',
+		'    """A thing without parameters."""',
+		'',
+		f'    class Inner{index}:',
+		'        pass',
+		'',
+	]
+	for i in range(config.funcs_per_file):
+		lines += [
+			f'    def method{i}(self, x, y=None):',
+			'        """Do something.',
+			'',
+			'        Returns',
+			'        -------',
+			'        int',
+			'            Something.',
+			'        """',
+			'        return x',
+			'',
+		]
+	return '\n'.join(lines) + '\n'
+
+
+def generate_file(rng: random.Random, config: CorpusConfig, index: int, classes: list[str]) -> str:
+	if config.plain_every and index % config.plain_every == config.plain_every - 1:
+		return generate_plain_file(rng, config, index, classes)
+	lines = ['from __future__ import annotations', '']
+	if index % 3 == 0:
+		lines.append('import typing')
+	if index % 5 == 0:
+		lines.append('from typing import *')
+	lines += ['import numpy as np', '', '']
+
+	# a class listing the parameters of `__init__` in its docstring
+	lines += [
+		f'class {classes[index]}:',
+		'    """A thing.',
+		'',
+		'    Parameters',
+		'    ----------',
+		'    x : float',
+		'        The x.',
+		f'    other : :class:`~.{rng.choice(classes)}`, optional',
+		'        Another thing.',
+		'    """',
+		'',
+		'    def __init__(self, x, other=None, **kwargs):',
+		'        self.x = x',
+		'',
+	]
+
+	if config.non_ascii_every and index % config.non_ascii_every == 0:
+		# the columns of the ast count these in utf8 bytes
+		lines += ['    def describe(self, café=None):', '        """Décrit la chose, en µm."""', '        return 1', '']
+
+	for i in range(config.funcs_per_file):
+		args = []
+		doc_args = []
+		for j in range(rng.randint(0, config.max_params_per_func)):
+			name = f'arg{j}'
+			kind = rng.random()
+			if kind < 0.2:
+				# annotated both in the code and in the docstring
+				type = rng.choice(ANNOTATED_TYPES)
+				args.append(f'{name}: {type} = None')
+				doc_args.append((name, f'{type}, optional'))
+			elif kind < 0.3:
+				# no type in the docstring
+				args.append(name)
+				doc_args.append((name, None))
+			else:
+				type = rng.choice(TYPES + [rng.choice(classes)])
+				args.append(f'{name}=None' if kind < 0.4 else name)
+				doc_args.append((name, type))
+		# once an arg has a default all the following args need one
+		has_default = False
+		for j, arg in enumerate(args):
+			if '=' in arg:
+				has_default = True
+			elif has_default:
+				args[j] = f'{arg}=0'
+		if rng.random() < 0.2:
+			args.append('*args')
+			doc_args.append(('args', 'int'))
+		# an arg which doesn't exist in the function
+		if rng.random() < 0.2:
+			doc_args.append(('unknown', 'int'))
+
+		lines.append(f'    def method{i}(self{"".join(f", {arg}" for arg in args)}):')
+		if doc_args or rng.random() < 0.5:
+			lines += ['        """Do something.', '']
+			if doc_args:
+				lines += ['        Parameters', '        ----------']
+				for name, type in doc_args:
+					lines.append(f'        {name} : {type}' if type else f'        {name}')
+					lines.append(f'            The {name}.')
+				lines += ['', '        Returns', '        -------', '        int', '            Something.']
+			lines.append('        """')
+		lines += ['        return 1', '']
+
+	return '\n'.join(lines) + '\n'
+
+
+def generate(root: pathlib.Path, config: CorpusConfig) -> None:
+	rng = random.Random(config.seed)
+	root.mkdir(parents=True, exist_ok=True)
+	(root / 'README.md').write_text('A synthetic manim repo\n')
+	classes = [f'Thing{i}' for i in range(config.files)]
+	for i in range(config.files):
+		path = root / 'manim' / f'package{i % 7}' / f'module{i}.py'
+		path.parent.mkdir(parents=True, exist_ok=True)
+		contents = generate_file(rng, config, i, classes)
+		if config.crlf_every and i % config.crlf_every == 0:
+			contents = contents.replace('\n', '\r\n')
+		path.write_bytes(contents.encode('utf8'))
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('root', type=pathlib.Path)
+	for field in dataclasses.fields(CorpusConfig):
+		parser.add_argument(f'--{field.name.replace("_", "-")}', type=int, default=field.default)
+	args = vars(parser.parse_args())
+	root = args.pop('root')
+	if root.exists() and any(root.iterdir()):
+		sys.exit(f'{root} is not empty')
+	generate(root, CorpusConfig(**args))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,56 @@
+# compares finding the files with glob('**/*.py') (the previous implementation) to the source finder,
+# on a synthetic tree inside a checkout with a large .git, virtualenv, node_modules and ignored build directory
+import argparse
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+from corpus import CorpusConfig, generate
+from discovery import SourceFinder
+
+
+# adds `count` files in nested directories under `directory`, every other one a .py file
+def add_tree(directory: pathlib.Path, count: int) -> None:
+	for i in range(count):
+		path = directory / f'd{i % 37}' / f'd{i % 11}' / f'f{i}{".py" if i % 2 else ".txt"}'
+		path.parent.mkdir(parents=True, exist_ok=True)
+		path.write_text('x = 1\n')
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--files', type=int, default=CorpusConfig.files * 10)
+	parser.add_argument('--ignored-files', type=int, default=20_000)
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as root:
+		root = pathlib.Path(root)
+		generate(root, CorpusConfig(files=args.files))
+		(root / '.gitignore').write_text('build/\n/media\n')
+		(root / '.venv').mkdir()
+		(root / '.venv' / 'pyvenv.cfg').write_text('home = /usr/bin\n')
+		for name in ('.git', '.venv', 'node_modules', 'build', 'media'):
+			add_tree(root / name, args.ignored_files // 5)
+
+		start = time.perf_counter()
+		glob_paths = [path for path in root.glob('**/*.py') if path.relative_to(root).parts[0] not in ('.git', '.venv', 'node_modules', 'build', 'media')]
+		glob_seconds = time.perf_counter() - start
+
+		finder = SourceFinder(root)
+		start = time.perf_counter()
+		paths = finder.find()
+		first_path = next(paths)
+		first_seconds = time.perf_counter() - start
+		found_paths = [first_path, *paths]
+		finder_seconds = time.perf_counter() - start
+		assert sorted(found_paths) == sorted(glob_paths)
+
+	print(f'{len(glob_paths)} files to fix, {args.ignored_files} files in ignored directories')
+	print(f'\t{"glob":<14} {glob_seconds * 1000:8.1f}ms')
+	print(f'\t{"source finder":<14} {finder_seconds * 1000:8.1f}ms, first file after {first_seconds * 1000:.1f}ms, skipped {finder.skipped_directories} directories')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,59 @@
+# compares registering edits in random order by inserting each one into a sorted list (the previous implementation)
+# to the edit buffer which sorts them once when they're read, at increasing numbers of edits
+import argparse
+import bisect
+import pathlib
+import random
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+from edits import EditBuffer
+
+
+def register_with_bisect(edits: list[tuple[int, int, str]]) -> list[tuple[slice, str]]:
+	modifications = []
+	for start, stop, replacement in edits:
+		modification = (slice(start, stop), replacement)
+		index = bisect.bisect(modifications, modification)
+		assert index == len(modifications) or stop <= modifications[index][0].start
+		assert index == 0 or modifications[index-1][0].stop <= start
+		modifications.insert(index, modification)
+	return modifications
+
+
+def register_with_edit_buffer(edits: list[tuple[int, int, str]]) -> EditBuffer:
+	edit_buffer = EditBuffer()
+	for start, stop, replacement in edits:
+		edit_buffer.add(start, stop, replacement)
+	# reading the edits sorts and checks them
+	list(edit_buffer)
+	return edit_buffer
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--edits', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+	args = parser.parse_args()
+
+	rng = random.Random(0)
+	for count in args.edits:
+		# non-overlapping edits in random order, as the fixers register them in the order of the args and not of the file
+		edits = [(i * 10, i * 10 + rng.randint(0, 5), ': float') for i in range(count)]
+		rng.shuffle(edits)
+
+		times = {}
+		results = {}
+		for func in (register_with_bisect, register_with_edit_buffer):
+			start = time.perf_counter()
+			results[func.__name__] = func(edits)
+			times[func.__name__] = time.perf_counter() - start
+		assert [(p.start, p.stop, r) for p, r in results['register_with_bisect']] == [e[:3] for e in results['register_with_edit_buffer']]
+
+		print(f'{count} edits')
+		for name, seconds in times.items():
+			print(f'\t{name:<28} {seconds * 1000:9.1f}ms {count / seconds:12.0f} edits/sec')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,72 @@
+# compares the list of line offsets found with a regex (the previous implementation) to the line index,
+# building them for a large file and converting the positions of all its ast nodes to offsets
+import argparse
+import ast
+import pathlib
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+from corpus import CorpusConfig, generate
+from line_index import LineIndex
+
+index_lines = lambda text: [match.start() for match in re.finditer(r'^', text, flags=re.MULTILINE)]
+
+
+# the time taken to build the object with `func`, and its size measured separately as tracing slows it down
+def measure(func, text):
+	start = time.perf_counter()
+	func(text)
+	seconds = time.perf_counter() - start
+	tracemalloc.start()
+	result = func(text)
+	size = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	return result, seconds, size
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--lines', type=int, default=200_000)
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as root:
+		root = pathlib.Path(root)
+		generate(root, CorpusConfig(files=200))
+		texts = [path.read_text('utf8') for path in sorted(root.glob('**/*.py'))]
+	# the synthetic files concatenated into one large file, some of them with non-ascii lines
+	parts = []
+	lines = 0
+	while lines < args.lines:
+		for text in texts:
+			parts.append(text)
+			lines += text.count('\n')
+	text = ''.join(parts)
+	positions = [(node.lineno, node.col_offset) for node in ast.walk(ast.parse(text)) if hasattr(node, 'lineno')]
+	print(f'{text.count(chr(10))} lines, {len(positions)} positions')
+
+	line_offsets, list_seconds, list_size = measure(index_lines, text)
+	line_index, index_seconds, index_size = measure(LineIndex, text)
+	assert list(line_index.line_starts) == line_offsets
+
+	start = time.perf_counter()
+	list_offsets = [line_offsets[lineno - 1] + col_offset for lineno, col_offset in positions]
+	list_convert_seconds = time.perf_counter() - start
+	start = time.perf_counter()
+	index_offsets = [line_index.offset(lineno, col_offset) for lineno, col_offset in positions]
+	index_convert_seconds = time.perf_counter() - start
+
+	# the positions are in utf8 bytes, which the list of offsets only converts correctly on ascii lines
+	lines = text.split('\n')
+	assert index_offsets == [line_offsets[lineno - 1] + len(lines[lineno - 1].encode('utf8')[:col_offset].decode('utf8')) for lineno, col_offset in positions]
+	wrong = sum(a != b for a, b in zip(list_offsets, index_offsets))
+
+	print(f'\t{"regex list":<12} build {list_seconds * 1000:7.1f}ms {list_size / 1024:9.0f}KiB  convert {list_convert_seconds * 1000:7.1f}ms  {wrong} wrong offsets')
+	print(f'\t{"line index":<12} build {index_seconds * 1000:7.1f}ms {index_size / 1024:9.0f}KiB  convert {index_convert_seconds * 1000:7.1f}ms')
+
+
+if __name__ == '__main__':
+	main()
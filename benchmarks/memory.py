@@ -0,0 +1,117 @@
+# measures the memory kept by the records of the functions and their parameters, per parameter,
+# with the previous layout of the records and with the slotted records
+import argparse
+import ast
+import dataclasses
+import gc
+import pathlib
+import sys
+import tempfile
+import tracemalloc
+import typing
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+from corpus import CorpusConfig, generate
+from file import File
+from func import Func
+
+
+# the layout of the records before they were slotted (the previous implementation), the values computed from the ast
+# were cached properties in the `__dict__`, the positions were slices, and each function kept its ast node and so
+# the ast of its file
+@dataclasses.dataclass
+class OldFunc:
+	file: File
+	func: ast.FunctionDef
+	node_with_docstring: typing.Optional[ast.AST] = None
+
+	@classmethod
+	def from_func(cls, func: Func, node: ast.FunctionDef) -> 'OldFunc':
+		self = cls(func.file, node, node)
+		# the cached properties
+		self.__dict__.update(
+			name=func.name,
+			lineno=func.lineno,
+			has_docstring=func.has_docstring,
+			docstring_position=func.docstring_position,
+			doc_args={
+				name: OldDocArg(self, doc_arg.type, doc_arg.annotation_position, doc_arg.name_position, doc_arg.position)
+				for name, doc_arg in func.doc_args.items()
+			},
+			func_args={
+				name: OldFuncArg(self, func_arg.type, func_arg.annotation_position, func_arg.default)
+				for name, func_arg in func.func_args.items()
+			},
+		)
+		return self
+
+
+@dataclasses.dataclass
+class OldDocArg:
+	func: OldFunc
+	type: typing.Optional[str]
+	annotation_position: slice
+	name_position: slice
+	position: slice
+
+
+@dataclasses.dataclass
+class OldFuncArg:
+	func: OldFunc
+	type: typing.Optional[str]
+	annotation_position: slice
+	default: typing.Optional[str]
+
+
+# the files with their contents and line indexes, which both layouts keep
+def load(root: pathlib.Path) -> list[File]:
+	files = [File(path, path.relative_to(root)) for path in sorted(root.glob('**/*.py'))]
+	for file in files:
+		_ = (file.contents, file.line_index)
+	return files
+
+
+# the memory kept by the records of all the files, and the number of parameters
+def measure(root: pathlib.Path, old_layout: bool) -> tuple[int, int]:
+	files = load(root)
+	gc.collect()
+	before = tracemalloc.get_traced_memory()[0]
+
+	params = 0
+	records = []
+	for file in files:
+		for func in file.functions:
+			params += len(func.doc_args) + len(func.func_args)
+		if old_layout:
+			nodes = {node.lineno: node for node in ast.walk(file.ast) if isinstance(node, ast.FunctionDef)}
+			records += [OldFunc.from_func(func, nodes[func.lineno]) for func in file.functions]
+			# only the old records are kept, and the ast through them
+			file.__dict__.pop('functions')
+		else:
+			# only the records should be kept, not the ast
+			file.__dict__.pop('ast', None)
+		file.__dict__.pop('summary')
+	gc.collect()
+	after = tracemalloc.get_traced_memory()[0]
+	return after - before, params
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--files', type=int, default=200)
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as root:
+		root = pathlib.Path(root)
+		generate(root, CorpusConfig(files=args.files))
+
+		tracemalloc.start()
+		results = {name: measure(root, old_layout) for name, old_layout in (('previous records', True), ('slotted records', False))}
+
+	print(f'{args.files} files, {results["slotted records"][1]} parameters')
+	for name, (kept, params) in results.items():
+		print(f'\t{name:<16} {kept:10} bytes kept, {kept / params:6.0f} bytes per parameter')
+
+
+if __name__ == '__main__':
+	main()
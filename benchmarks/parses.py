@@ -0,0 +1,75 @@
+# counts the times each file is parsed when fixing a synthetic tree, every file should be parsed once even if it's modified,
+# including when the ast was dropped before writing like with --low-memory, --jobs and the cache
+import argparse
+import ast
+import contextlib
+import importlib.util
+import pathlib
+import sys
+import tempfile
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+from corpus import CorpusConfig, generate
+from exports import ExportIndex
+from file import File
+from import_graph import ImportGraph
+
+# the script's name isn't a valid module name
+spec = importlib.util.spec_from_file_location('fix_params', pathlib.Path(__file__).parent.parent / 'fix-params.py')
+fix_params = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(fix_params)
+
+
+# counts the calls to `ast.parse` by filename, the annotations which are parsed have no filename
+@contextlib.contextmanager
+def count_parses():
+	parses = {}
+	parse = ast.parse
+
+	def counting_parse(source, filename='<unknown>', *args, **kwargs):
+		if filename != '<unknown>':
+			parses[filename] = parses.get(filename, 0) + 1
+		return parse(source, filename, *args, **kwargs)
+
+	ast.parse = counting_parse
+	try:
+		yield parses
+	finally:
+		ast.parse = parse
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--files', type=int, default=CorpusConfig.files)
+	parser.add_argument('--release', action='store_true', help='release the files before writing them, like --low-memory')
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as root, count_parses() as parses:
+		root = pathlib.Path(root)
+		generate(root, CorpusConfig(files=args.files))
+		files = [File(path, path.relative_to(root)) for path in root.glob('**/*.py')]
+		funcs = [func for file in files for func in file.functions]
+		funcs_with_params_in_docstring = [f for f in funcs if f.doc_args]
+		funcs_with_param_types_in_docstring = [f for f in funcs_with_params_in_docstring if any(arg.type for arg in f.doc_args.values())]
+		fix_params.fix_unknown_args(funcs_with_params_in_docstring)
+		fix_params.fix_args_with_redundant_types(funcs_with_param_types_in_docstring)
+		fix_params.fix_args_with_no_type_annotation(funcs_with_param_types_in_docstring)
+		export_index = ExportIndex.from_files(files)
+		if args.release:
+			for file in files:
+				file.release()
+		import_graph = ImportGraph.from_index(export_index)
+		modified_files = []
+		for file in files:
+			file.register_imports_modification(export_index, import_graph)
+			if file.modifications:
+				modified_files.append(file.name)
+			file.apply_modifications()
+
+	print(f'{len(files)} files, {len(modified_files)} modified, {sum(parses.values())} parses')
+	print(f'{sum(parses[name] for name in modified_files) / len(modified_files):.2f} parses per modified file')
+	assert all(parses[name] == 1 for name in modified_files), 'a modified file was parsed more than once'
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,46 @@
+# compares loading every file with a full parse (the previous implementation) to scanning them first and only parsing
+# the files which may have something to fix, at increasing shares of files without parameters in their docstrings
+import argparse
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+from corpus import CorpusConfig, generate
+from exports import FileExports
+from file import File, load_files
+
+
+# loads the files and gets everything the fixers and the export index need from them
+def load(root: pathlib.Path, prescan: bool) -> tuple[dict[str, FileExports], int]:
+	files = load_files(sorted(root.glob('**/*.py')), root, prescan=prescan)
+	_ = [func.doc_args for file in files for func in file.functions]
+	return {file.name: FileExports.from_file(file) for file in files}, sum(isinstance(file, File) for file in files)
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--files', type=int, default=CorpusConfig.files * 10)
+	parser.add_argument('--plain-every', type=int, nargs='+', default=[4, 2, 1], help='every n-th file has no parameters in its docstrings')
+	args = parser.parse_args()
+
+	for plain_every in args.plain_every:
+		with tempfile.TemporaryDirectory() as root:
+			root = pathlib.Path(root)
+			generate(root, CorpusConfig(files=args.files, plain_every=plain_every))
+			times = {}
+			results = {}
+			for prescan in (False, True):
+				start = time.perf_counter()
+				results[prescan] = load(root, prescan)
+				times[prescan] = time.perf_counter() - start
+		assert results[False][0] == results[True][0], 'the scan found different exports than parsing'
+
+		print(f'{args.files} files, {args.files // plain_every} without parameters in their docstrings')
+		print(f'\t{"parse all":<10} {times[False] * 1000:8.1f}ms, parsed {results[False][1]} files')
+		print(f'\t{"prescan":<10} {times[True] * 1000:8.1f}ms, parsed {results[True][1]} files')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,76 @@
+# times each stage of the script on synthetic trees of increasing size, to spot stages which scale superlinearly
+import argparse
+import contextlib
+import importlib.util
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+from corpus import CorpusConfig, generate
+from exports import ExportIndex
+from file import File
+from import_graph import ImportGraph
+
+# the script's name isn't a valid module name
+spec = importlib.util.spec_from_file_location('fix_params', pathlib.Path(__file__).parent.parent / 'fix-params.py')
+fix_params = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(fix_params)
+
+
+def run_stages(root: pathlib.Path) -> tuple[dict[str, float], int, int]:
+	times = {}
+
+	@contextlib.contextmanager
+	def stage(name):
+		start = time.perf_counter()
+		yield
+		times[name] = time.perf_counter() - start
+
+	with stage('load'):
+		files = [File(path, path.relative_to(root)) for path in root.glob('**/*.py')]
+		funcs = [func for file in files for func in file.functions]
+		for func in funcs:
+			_ = func.func_args
+	with stage('doc_args'):
+		funcs_with_params_in_docstring = [f for f in funcs if f.doc_args]
+	funcs_with_param_types_in_docstring = [f for f in funcs_with_params_in_docstring if any(arg.type for arg in f.doc_args.values())]
+	params = sum(len(f.doc_args) for f in funcs_with_params_in_docstring)
+	with stage('fix_unknown_args'):
+		fix_params.fix_unknown_args(funcs_with_params_in_docstring)
+	with stage('fix_args_with_redundant_types'):
+		fix_params.fix_args_with_redundant_types(funcs_with_param_types_in_docstring)
+	with stage('fix_args_with_no_type_annotation'):
+		fix_params.fix_args_with_no_type_annotation(funcs_with_param_types_in_docstring)
+	with stage('register_imports_modification'):
+		export_index = ExportIndex.from_files(files)
+		import_graph = ImportGraph.from_index(export_index)
+		for file in files:
+			file.register_imports_modification(export_index, import_graph)
+	with stage('apply_modifications'):
+		for file in files:
+			file.apply_modifications()
+
+	return times, len(files), params
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--files', type=int, default=CorpusConfig.files, help='the number of files at 1x')
+	parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+	args = parser.parse_args()
+
+	for scale in args.scales:
+		with tempfile.TemporaryDirectory() as root:
+			root = pathlib.Path(root)
+			generate(root, CorpusConfig(files=args.files * scale))
+			times, files, params = run_stages(root)
+
+		print(f'{scale}x: {files} files, {params} docstring params')
+		for name, seconds in times.items():
+			print(f'\t{name:<34} {seconds * 1000:9.1f}ms {files / seconds:10.0f} files/sec {params / seconds:10.0f} params/sec')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,54 @@
+# compares the ast nodes visited by the single traversal of `File.summary` to the separate walks it replaced
+import argparse
+import ast
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+from corpus import CorpusConfig, generate
+from file import File
+
+
+# a walk of the whole tree for each of the functions, exports and imports, a walk of each class documenting `__init__`,
+# and the top-level nodes for the offset of the imports
+def separate_walks(tree: ast.Module) -> int:
+	visited_nodes = 0
+	for node in ast.walk(tree):
+		visited_nodes += 1
+		if isinstance(node, ast.ClassDef):
+			class_docstring = ast.get_docstring(node)
+			if class_docstring and 'Parameters' in class_docstring:
+				visited_nodes += sum(1 for _ in ast.walk(node))
+	visited_nodes += 2 * sum(1 for _ in ast.walk(tree))
+	visited_nodes += sum(1 for _ in ast.iter_child_nodes(tree))
+	return visited_nodes
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--files', type=int, default=200)
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as root:
+		root = pathlib.Path(root)
+		generate(root, CorpusConfig(files=args.files))
+		files = [File(path, path.relative_to(root)) for path in root.glob('**/*.py')]
+		for file in files:
+			_ = file.ast
+
+		start = time.perf_counter()
+		old_visited_nodes = sum(separate_walks(file.ast) for file in files)
+		old_time = time.perf_counter() - start
+		start = time.perf_counter()
+		new_visited_nodes = sum(file.summary.visited_nodes for file in files)
+		new_time = time.perf_counter() - start
+
+	print(f'{len(files)} files')
+	print(f'\tseparate walks: {old_visited_nodes} nodes visited, {old_time * 1000:.1f}ms (without building the functions)')
+	print(f'\tsingle traversal: {new_visited_nodes} nodes visited, {new_time * 1000:.1f}ms (including building the functions)')
+
+
+if __name__ == '__main__':
+	main()
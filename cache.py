@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import collections
+import dataclasses
+import hashlib
+import os
+import pathlib
+import pickle
+import typing
+
+if typing.TYPE_CHECKING:
+	from file import File
+
+
+SCRIPT_DIR = pathlib.Path(__file__).parent
+DEFAULT_CACHE_DIR = SCRIPT_DIR / '.fix-params-cache'
+# the size of the cache after eviction, in bytes
+MAX_CACHE_SIZE = 256 * 1024 * 1024
+# the size of the pickled files kept in memory by a batch of repos, in bytes
+MAX_MEMORY_CACHE_SIZE = 128 * 1024 * 1024
+# the cached data is derived by these modules, so any change in them invalidates the cache
+SCRIPT_VERSION = hashlib.sha256(b''.join((SCRIPT_DIR / name).read_bytes() for name in ('file.py', 'func.py', 'utils.py', 'exports.py', 'import_graph.py', 'edits.py', 'line_index.py', 'prescan.py'))).hexdigest()[:16]
+
+
+# a cache of parsed files on disk, keyed by the contents of the file and the version of the script,
+# optionally with the most recently used entries in memory too, or only in memory if there is no directory
+@dataclasses.dataclass
+class ParseCache:
+	directory: typing.Optional[pathlib.Path] = DEFAULT_CACHE_DIR
+	max_size: int = MAX_CACHE_SIZE
+	# 0 to not keep entries in memory
+	memory_size: int = 0
+	# the pickled files by key, from the least to the most recently used
+	memory: collections.OrderedDict[str, bytes] = dataclasses.field(default_factory=collections.OrderedDict, repr=False, compare=False)
+	memory_bytes: int = 0
+	memory_hits: int = 0
+
+	# everything which is cached is derived from the contents and the newlines, so they're hashed instead of reading the raw
+	# contents again
+	def key(self, file: File) -> str:
+		contents = file.contents
+		return hashlib.sha256(f'{file.newline}{contents}'.encode()).hexdigest()
+
+	def entry_path(self, key: str) -> pathlib.Path:
+		return self.directory / SCRIPT_VERSION / f'{key}.pickle'
+
+	# where the export index of a repo is saved, for incremental runs
+	def export_index_path(self, root: pathlib.Path) -> pathlib.Path:
+		key = hashlib.sha256(str(root.resolve()).encode()).hexdigest()
+		return self.directory / SCRIPT_VERSION / f'exports-{key}.json'
+
+	# the cached file with the same contents, or the file itself after parsing it
+	def load(self, file: File) -> File:
+		key = self.key(file)
+
+		if (pickled_file := self.memory.get(key)) is not None:
+			self.memory.move_to_end(key)
+			self.memory_hits += 1
+			return self._moved(pickle.loads(pickled_file), file.path, file.relative_path)
+
+		if self.directory is not None:
+			entry_path = self.entry_path(key)
+			try:
+				pickled_file = entry_path.read_bytes()
+				cached_file = pickle.loads(pickled_file)
+			except (OSError, EOFError, pickle.UnpicklingError):
+				pass
+			else:
+				# mark the entry as recently used for eviction
+				os.utime(entry_path)
+				self._remember(key, pickled_file)
+				return self._moved(cached_file, file.path, file.relative_path)
+
+		file.preload()
+		pickled_file = pickle.dumps(file, pickle.HIGHEST_PROTOCOL)
+		if self.directory is not None:
+			entry_path.parent.mkdir(parents=True, exist_ok=True)
+			# write to a temporary file and rename so concurrent processes never see a partial entry
+			temp_path = entry_path.with_suffix(f'.{os.getpid()}.tmp')
+			temp_path.write_bytes(pickled_file)
+			os.replace(temp_path, entry_path)
+		self._remember(key, pickled_file)
+		return file
+
+	# the same contents may be cached from another path
+	def _moved(self, file: File, path: pathlib.Path, relative_path: pathlib.Path) -> File:
+		cached_module_name = file.module_name
+		file.path = path
+		file.relative_path = relative_path
+		del file.name, file.module_name
+		# the imported modules depend on the module name, through the relative imports and since only manim modules have them
+		if file.module_name != cached_module_name:
+			file.invalidate(('imported_modules',))
+		return file
+
+	# keep the entry in memory, forgetting the least recently used ones which don't fit anymore
+	def _remember(self, key: str, pickled_file: bytes) -> None:
+		if len(pickled_file) > self.memory_size:
+			return
+		self.memory[key] = pickled_file
+		self.memory_bytes += len(pickled_file)
+		while self.memory_bytes > self.memory_size:
+			self.memory_bytes -= len(self.memory.popitem(last=False)[1])
+
+	# the processes which load the files get the cache without the entries in memory
+	def __getstate__(self) -> dict:
+		return self.__dict__ | {'memory': collections.OrderedDict(), 'memory_bytes': 0}
+
+	# delete the least recently used entries until the cache fits in `max_size`, and entries of other versions
+	def evict(self) -> None:
+		if not self.directory.is_dir():
+			return
+		for version_dir in self.directory.iterdir():
+			if version_dir.name != SCRIPT_VERSION:
+				for entry_path in version_dir.iterdir():
+					entry_path.unlink()
+				version_dir.rmdir()
+
+		entries = [(entry_path, entry_path.stat()) for entry_path in self.directory.glob(f'{SCRIPT_VERSION}/*.pickle')]
+		total_size = sum(stat.st_size for _, stat in entries)
+		for entry_path, stat in sorted(entries, key=lambda entry: entry[1].st_mtime):
+			if total_size <= self.max_size:
+				break
+			entry_path.unlink()
+			total_size -= stat.st_size
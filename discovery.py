@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import dataclasses
+import functools
+import os
+import pathlib
+import re
+import typing
+
+
+# the files to fix, relative to the root
+DEFAULT_INCLUDE = ('*.py',)
+# directories which never have files to fix, even if they're not in a .gitignore
+DEFAULT_EXCLUDE = ('.git/', '.hg/', '.svn/', '.tox/', '.nox/', '.mypy_cache/', '__pycache__/', 'node_modules/')
+# a directory with this file is a virtualenv
+VIRTUALENV_MARKER = 'pyvenv.cfg'
+
+
+# translates a glob with the syntax of .gitignore to a regex matching the paths relative to the directory of the glob,
+# a glob without a slash matches files and directories at any depth, and one with a slash is anchored to the directory
+@functools.lru_cache(maxsize=None)
+def glob_regex(glob: str) -> re.Pattern:
+	if '/' not in glob:
+		glob = '**/' + glob
+	glob = glob.removeprefix('/')
+	parts = []
+	i = 0
+	while i < len(glob):
+		if glob.startswith('**/', i):
+			# any number of directories, including none
+			parts.append('(?:.*/)?')
+			i += 3
+		elif glob.startswith('/**', i) and i + 3 == len(glob):
+			# everything in the directory
+			parts.append('/.*')
+			i += 3
+		elif glob[i] == '*':
+			parts.append('[^/]*')
+			i += 1
+		elif glob[i] == '?':
+			parts.append('[^/]')
+			i += 1
+		elif glob[i] == '[' and (end := glob.find(']', i + 2)) != -1:
+			# a ']' right after the '[' is part of the class
+			chars = glob[i + 1:end]
+			parts.append('[' + ('^' + chars[1:] if chars.startswith('!') else chars).replace('\\', '\\\\') + ']')
+			i = end + 1
+		elif glob[i] == '\\' and i + 1 < len(glob):
+			parts.append(re.escape(glob[i + 1]))
+			i += 2
+		else:
+			parts.append(re.escape(glob[i]))
+			i += 1
+	return re.compile(''.join(parts) + r'\Z', re.DOTALL)
+
+
+# a line of a .gitignore, or an included or excluded glob
+@dataclasses.dataclass(frozen=True)
+class GlobRule:
+	regex: re.Pattern
+	# whether the rule cancels the previous rules for the paths it matches, when it starts with '!'
+	negated: bool
+	# whether the rule only matches directories, when it ends with '/'
+	directory_only: bool
+
+	@classmethod
+	def parse(cls, line: str) -> typing.Optional[GlobRule]:
+		line = line.rstrip('\n').rstrip(' ')
+		if not line or line.startswith('#'):
+			return None
+		negated = line.startswith('!')
+		if negated:
+			line = line[1:]
+		directory_only = line.endswith('/')
+		line = line.rstrip('/')
+		if not line:
+			return None
+		return cls(glob_regex(line), negated, directory_only)
+
+	def matches(self, name: str, is_directory: bool) -> bool:
+		return (is_directory or not self.directory_only) and self.regex.match(name) is not None
+
+
+# the rules of a .gitignore or the included or excluded globs, which apply to the paths under `base`
+@dataclasses.dataclass(frozen=True)
+class GlobRules:
+	# the directory of the rules relative to the root, '' for the root
+	base: str
+	rules: tuple[GlobRule, ...]
+
+	@classmethod
+	def from_lines(cls, base: str, lines: typing.Iterable[str]) -> GlobRules:
+		return cls(base, tuple(rule for line in lines if (rule := GlobRule.parse(line)) is not None))
+
+	@classmethod
+	def read(cls, path: pathlib.Path, base: str) -> GlobRules:
+		try:
+			return cls.from_lines(base, path.read_text('utf8', errors='replace').splitlines())
+		except OSError:
+			return cls(base, ())
+
+	# whether the last rule matching the path isn't negated, `None` if no rule matches it
+	def matches(self, name: str, is_directory: bool) -> typing.Optional[bool]:
+		if self.base:
+			name = name[len(self.base) + 1:]
+		for rule in reversed(self.rules):
+			if rule.matches(name, is_directory):
+				return not rule.negated
+		return None
+
+
+# finds the files to fix under the root while walking it, without entering the directories which are excluded,
+# ignored by a .gitignore or virtualenvs, so the time taken depends on the size of the source and not of the checkout
+@dataclasses.dataclass
+class SourceFinder:
+	root: pathlib.Path
+	include: tuple[str, ...] = DEFAULT_INCLUDE
+	exclude: tuple[str, ...] = DEFAULT_EXCLUDE
+	gitignore: bool = True
+	# the directories which weren't entered and the files which matched `include` but were excluded, in the last walk
+	skipped_directories: int = 0
+	skipped_files: int = 0
+
+	include_rules: GlobRules = dataclasses.field(init=False, repr=False)
+	exclude_rules: GlobRules = dataclasses.field(init=False, repr=False)
+
+	def __post_init__(self) -> None:
+		self.include_rules = GlobRules.from_lines('', self.include)
+		self.exclude_rules = GlobRules.from_lines('', self.exclude)
+
+	# the paths of the files to fix, yielded while walking so they can be loaded before the walk finishes,
+	# the files of a directory are yielded before the ones in its subdirectories, in order of their names
+	def find(self) -> typing.Iterator[pathlib.Path]:
+		self.skipped_directories = self.skipped_files = 0
+		yield from self._walk(self.root, '', ())
+
+	# the names of the files to fix relative to the root
+	def find_names(self) -> typing.Iterator[str]:
+		return (path.relative_to(self.root).as_posix() for path in self.find())
+
+	# whether the file would be found by walking the tree, from its name relative to the root,
+	# for the files which are found in another way, like the ones changed since a git ref
+	def includes(self, name: str) -> bool:
+		if not self.include_rules.matches(name, False):
+			return False
+		gitignores = ()
+		relative_name = ''
+		for part in name.split('/')[:-1]:
+			if self.gitignore:
+				gitignores += (GlobRules.read(self.root / relative_name / '.gitignore', relative_name),)
+			relative_name = f'{relative_name}/{part}' if relative_name else part
+			if self._excluded(relative_name, True, gitignores) or (self.root / relative_name / VIRTUALENV_MARKER).exists():
+				return False
+		if self.gitignore:
+			gitignores += (GlobRules.read(self.root / relative_name / '.gitignore', relative_name),)
+		return not self._excluded(name, False, gitignores)
+
+	# `gitignores` are the rules of the .gitignore files in the directories of the path, from the root down
+	def _excluded(self, name: str, is_directory: bool, gitignores: tuple[GlobRules, ...]) -> bool:
+		if self.exclude_rules.matches(name, is_directory):
+			return True
+		# the rules of deeper .gitignore files take precedence
+		for rules in reversed(gitignores):
+			ignored = rules.matches(name, is_directory)
+			if ignored is not None:
+				return ignored
+		return False
+
+	def _walk(self, directory: pathlib.Path, relative_name: str, gitignores: tuple[GlobRules, ...]) -> typing.Iterator[pathlib.Path]:
+		try:
+			with os.scandir(directory) as it:
+				entries = sorted(it, key=lambda entry: entry.name)
+		except OSError:
+			# deleted while walking or not readable
+			return
+		if relative_name and any(entry.name == VIRTUALENV_MARKER for entry in entries):
+			self.skipped_directories += 1
+			return
+		if self.gitignore and any(entry.name == '.gitignore' for entry in entries):
+			gitignores += (GlobRules.read(directory / '.gitignore', relative_name),)
+
+		subdirectories = []
+		for entry in entries:
+			name = f'{relative_name}/{entry.name}' if relative_name else entry.name
+			try:
+				# symlinks to directories aren't followed, which could loop
+				if entry.is_dir(follow_symlinks=False):
+					if self._excluded(name, True, gitignores):
+						self.skipped_directories += 1
+					else:
+						subdirectories.append((entry.path, name))
+					continue
+				if not entry.is_file() or not self.include_rules.matches(name, False):
+					continue
+			except OSError:
+				continue
+			if self._excluded(name, False, gitignores):
+				self.skipped_files += 1
+			else:
+				yield pathlib.Path(entry.path)
+		for path, name in subdirectories:
+			yield from self._walk(pathlib.Path(path), name, gitignores)
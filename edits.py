@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import dataclasses
+import operator
+import typing
+
+
+# the source of the edits registered in the current context, when it isn't given explicitly
+_current_source: contextvars.ContextVar[typing.Optional[str]] = contextvars.ContextVar('edit_source', default=None)
+
+
+# attribute the edits registered inside to `source`, for reporting overlapping edits
+@contextlib.contextmanager
+def edit_source(source: str) -> typing.Iterator[None]:
+	token = _current_source.set(source)
+	try:
+		yield
+	finally:
+		_current_source.reset(token)
+
+
+# represents the change `contents[start:stop] = replacement`
+class Edit(typing.NamedTuple):
+	start: int
+	stop: int
+	replacement: str
+	# the fixer or step which registered the edit
+	source: typing.Optional[str] = None
+
+	def __str__(self) -> str:
+		return f'{self.source or "unknown source"} replacing [{self.start}:{self.stop}] with {self.replacement!r}'
+
+
+class OverlappingEditsError(ValueError):
+	def __init__(self, edit: Edit, other_edit: Edit, name: typing.Optional[str] = None) -> None:
+		super().__init__(f'{f"{name}: " if name else ""}{edit} overlaps {other_edit}')
+		self.edit = edit
+		self.other_edit = other_edit
+
+
+# edits are sorted by position, and edits at the same position by their replacement like the tuples they replaced
+_edit_key = operator.itemgetter(0, 1, 2)
+
+
+# the edits of a file sorted by position, so they can be applied in a single pass,
+# new edits are appended and only sorted into the others when the edits are read,
+# so registering n edits takes O(n log n) in total instead of an O(n) insert for each
+@dataclasses.dataclass
+class EditBuffer:
+	edits: list[Edit] = dataclasses.field(default_factory=list)
+	# the number of edits at the start of `edits` which are already sorted and checked for overlaps
+	checked: int = 0
+
+	def __len__(self) -> int:
+		return len(self.edits)
+
+	def __iter__(self) -> typing.Iterator[Edit]:
+		self.sort()
+		return iter(self.edits)
+
+	def add(self, start: int, stop: int, replacement: str, source: typing.Optional[str] = None) -> None:
+		assert 0 <= start <= stop, f'invalid edit [{start}:{stop}]'
+		self.edits.append(Edit(start, stop, replacement, source or _current_source.get()))
+
+	def extend(self, edits: typing.Iterable[tuple[int, int, str]], source: typing.Optional[str] = None) -> None:
+		for start, stop, replacement in edits:
+			self.add(start, stop, replacement, source)
+
+	def clear(self) -> None:
+		self.edits.clear()
+		self.checked = 0
+
+	# sort the new edits into the others and make sure no two edits overlap
+	def sort(self) -> None:
+		if self.checked == len(self.edits):
+			return
+		# the sorted edits and the new edits are two runs, which timsort merges in linear time after sorting the new ones
+		self.edits.sort(key=_edit_key)
+		for edit, next_edit in zip(self.edits, self.edits[1:]):
+			if edit.stop > next_edit.start:
+				raise OverlappingEditsError(edit, next_edit)
+		self.checked = len(self.edits)
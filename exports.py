@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import pathlib
+import re
+import typing
+
+if typing.TYPE_CHECKING:
+	from file import File
+	from prescan import ScannedFile
+
+
+TYPING_NAMES = frozenset(dir(typing))
+# names which are imported in a special way
+SPECIAL_IMPORT_STMTS = {'np': 'import numpy as np\n'}
+
+
+# what the export index needs to know about a file, without parsing it again
+@dataclasses.dataclass
+class FileExports:
+	module_name: typing.Optional[str]
+	exports: list[str]
+	# the names used by the types in the docstrings of the file, which it may need to import
+	references: list[str]
+	# the modules imported by the top-level code of the file
+	imported_modules: list[str]
+
+	@classmethod
+	def from_file(cls, file: File | ScannedFile) -> FileExports:
+		references = {
+			name
+			for func in file.functions
+			for doc_arg in func.doc_args.values()
+			if doc_arg.type
+			for name in re.findall(r'\w+', doc_arg.type)
+		}
+		return cls(file.module_name, sorted(file.exports), sorted(references), file.imported_modules)
+
+
+# maps the names exported by all the files in the project to the modules defining them, built once after loading
+@dataclasses.dataclass
+class ExportIndex:
+	# by the name of the file, in the order of the files
+	files: dict[str, FileExports]
+	# the modification times of the files when they were loaded, by their names, so a later run finds the files which
+	# changed since without reading them
+	mtimes: dict[str, int] = dataclasses.field(default_factory=dict)
+	# names which are defined in more than one module and were imported, with the module they were imported from
+	ambiguous_imports: dict[str, str] = dataclasses.field(init=False, default_factory=dict)
+
+	def __post_init__(self) -> None:
+		# all the modules defining each name, in the order of the files
+		self.name_to_defining_modules = {}
+		for file_exports in self.files.values():
+			if file_exports.module_name:
+				for export in file_exports.exports:
+					self.name_to_defining_modules.setdefault(export, []).append(file_exports.module_name)
+
+	@classmethod
+	def from_files(cls, files: list[File]) -> ExportIndex:
+		return cls({file.name: FileExports.from_file(file) for file in files})
+
+	@classmethod
+	def load(cls, path: pathlib.Path) -> ExportIndex:
+		index = json.loads(path.read_text('utf8'))
+		return cls({name: FileExports(**file_exports) for name, file_exports in index['files'].items()}, index['mtimes'])
+
+	def save(self, path: pathlib.Path) -> None:
+		path.parent.mkdir(parents=True, exist_ok=True)
+		files = {name: dataclasses.asdict(file_exports) for name, file_exports in self.files.items()}
+		path.write_text(json.dumps({'files': files, 'mtimes': self.mtimes}), 'utf8')
+
+	# a new index with the given files added or replaced, and the deleted files removed
+	def updated(self, files: list[File | ScannedFile], deleted_file_names: typing.Iterable[str] = ()) -> ExportIndex:
+		updated_files = self.files | {file.name: FileExports.from_file(file) for file in files}
+		for name in deleted_file_names:
+			updated_files.pop(name, None)
+		return ExportIndex(updated_files, self.mtimes)
+
+	# the names of the files which may need to import any of the given names
+	def referencing_files(self, names: set[str]) -> list[str]:
+		return [name for name, file_exports in self.files.items() if not names.isdisjoint(file_exports.references)]
+
+	@property
+	def ambiguous_names(self) -> dict[str, list[str]]:
+		return {name: modules for name, modules in self.name_to_defining_modules.items() if len(modules) > 1}
+
+	def defining_module(self, name: str) -> str:
+		modules = self.name_to_defining_modules.get(name)
+		if modules is None:
+			# names from `typing` have the lowest priority
+			if name in TYPING_NAMES:
+				return 'typing'
+			raise KeyError(name)
+		# the last module wins, but remember it so it can be reported
+		if len(modules) > 1:
+			self.ambiguous_imports[name] = modules[-1]
+		return modules[-1]
+
+	# the module which the import statement of the name imports
+	def imported_module(self, name: str) -> str:
+		if name in SPECIAL_IMPORT_STMTS:
+			return SPECIAL_IMPORT_STMTS[name].split()[1]
+		return self.defining_module(name)
+
+	# the modules which the import statement of the name imports when it runs, like `find_imported_modules`
+	def imported_modules(self, name: str) -> list[str]:
+		if name in SPECIAL_IMPORT_STMTS:
+			return [self.imported_module(name)]
+		module = self.defining_module(name)
+		return [module, f'{module}.{name}']
+
+	# the files imported more modules, after imports were added to them
+	def add_imported_modules(self, file_name: str, modules: list[str]) -> None:
+		file_exports = self.files[file_name]
+		file_exports.imported_modules = list(dict.fromkeys(file_exports.imported_modules + modules))
+
+	# an import statement that imports the name
+	def import_stmt(self, name: str) -> str:
+		if name in SPECIAL_IMPORT_STMTS:
+			return SPECIAL_IMPORT_STMTS[name]
+		return f'from {self.defining_module(name)} import {name}\n'
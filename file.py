@@ -1,27 +1,152 @@
 from __future__ import annotations
 
 import ast
-import bisect
+import builtins
+import collections
+import concurrent.futures
 import dataclasses
+import difflib
 import functools
+import itertools
 import pathlib
 import typing
 
+from edits import EditBuffer, OverlappingEditsError
+from exports import TYPING_NAMES
 from func import Func
-from special_cases import CIRCULAR_IMPORTS
-from utils import index_lines
+from import_graph import find_imported_modules
+from line_index import LineIndex
+from prescan import ScannedFile
+from utils import apply_modifications, split_lines
+from writer import write_file
+
+if typing.TYPE_CHECKING:
+	from cache import ParseCache
+	from exports import ExportIndex
+	from import_graph import ImportGraph
+	from writer import FileWriter
+
+
+BUILTIN_NAMES = frozenset(dir(builtins))
+# the cached properties of `File` which are derived from its contents
+DERIVED_FROM_CONTENTS = ('line_index', 'ast', 'summary', 'functions', 'exports', 'imports', 'imported_modules', 'offset_for_adding_imports')
+# the cached properties which `release` drops, the others are needed for registering the imports
+RELEASED = ('contents', 'line_index', 'ast', 'summary', 'functions')
+
+
+# the names that an import statement adds to the global scope
+def imported_names(node: ast.Import | ast.ImportFrom) -> set[str]:
+	if isinstance(node, ast.ImportFrom) and node.module == '__future__':
+		return set()
+	if isinstance(node, ast.ImportFrom) and node.names[0].name == '*':
+		# `from typing import *` appears in the code so we take advantage of it
+		if node.module == 'typing':
+			return set(TYPING_NAMES)
+		# ignore all other star imports
+		return set()
+	return {n.asname or n.name.split('.')[0] for n in node.names}
+
+
+class SimplifyImports(ast.NodeTransformer):
+	def __init__(self, already_imported: frozenset[str], to_import: set[str]) -> None:
+		self.already_imported = already_imported
+		self.to_import = to_import
+
+	# in some cases `foo.bar` is used and `foo` is not imported but `bar` is,
+	# so switch the annotation to use `bar` directly
+	def visit_Attribute(self, node):
+		if isinstance(node.value, ast.Name) and (node.attr in self.already_imported or node.attr in self.to_import):
+			if node.value.id in self.to_import:
+				self.to_import.remove(node.value.id)
+			return ast.Name(node.attr)
+
+		self.generic_visit(node)
+		return node
+
+	# if `typing` is imported, use it instead of adding more imports
+	def visit_Name(self, node):
+		if node.id not in self.already_imported and ('typing' in self.already_imported or 'typing' in self.to_import) and node.id in TYPING_NAMES:
+			if node.id in self.to_import:
+				self.to_import.remove(node.id)
+			return ast.Attribute(ast.Name('typing'), node.id)
+
+		return node
+
+
+# the names in an expression which decide how it's simplified
+@functools.lru_cache(maxsize=4096)
+def expression_names(expression: str) -> tuple[str, ...]:
+	names = {'typing'}
+	for node in ast.walk(ast.parse(expression)):
+		if isinstance(node, ast.Name):
+			names.add(node.id)
+		elif isinstance(node, ast.Attribute):
+			names.add(node.attr)
+	return tuple(sorted(names))
+
+
+# the expression using the names which are already imported where possible, and the names it still needs to import,
+# `already_imported` only has to include the names of the expression
+@functools.lru_cache(maxsize=4096)
+def simplify_imports(expression: str, already_imported: frozenset[str]) -> tuple[str, frozenset[str]]:
+	expression = ast.parse(expression)
+	# find all the names used in the annotation that we need to import
+	to_import = {node.id for node in ast.walk(expression) if isinstance(node, ast.Name)} - already_imported
+	# simplify imports and update the expression accordingly
+	SimplifyImports(already_imported, to_import).visit(expression)
+	return ast.unparse(expression), frozenset(to_import)
+
+
+# everything needed from the ast of a file
+@dataclasses.dataclass
+class FileSummary:
+	functions: list[Func]
+	# the names of all the classes defined in the file
+	exports: set[str]
+	imports: set[str]
+	# the last line of the last top-level import
+	last_import_line: typing.Optional[int]
+	# the number of ast nodes visited to collect it
+	visited_nodes: int
 
 
 @dataclasses.dataclass
 class File:
 	path: pathlib.Path
 	relative_path: pathlib.Path
-	modifications: list[tuple[slice, str]] = dataclasses.field(init=False, default_factory=list)
+	modifications: EditBuffer = dataclasses.field(init=False, default_factory=EditBuffer)
 	to_import: set[str] = dataclasses.field(init=False, default_factory=set)
+	newline: str = dataclasses.field(init=False, default='\n')
 
 	def __hash__(self) -> int:
 		return hash(self.name)
 
+	# drop the ast when sending to another process, everything derived from it must be computed before that
+	def __getstate__(self) -> dict:
+		state = self.__dict__.copy()
+		state.pop('ast', None)
+		state.pop('summary', None)
+		state.pop('line_index', None)
+		return state
+
+	# compute everything that is derived from the ast, so the file can be sent to another process without it
+	def preload(self) -> File:
+		_ = (self.name, self.module_name, self.exports, self.imports, self.imported_modules)
+		try:
+			_ = self.offset_for_adding_imports
+		except ValueError:
+			# no imports in the file, this is only a problem if we need to add imports to it so let it fail later
+			pass
+		for func in self.functions:
+			func.preload()
+		return self
+
+	# drop the contents and everything derived from them to save memory, keeping what's needed for registering the imports,
+	# the contents are read again from the disk when they're needed
+	def release(self) -> None:
+		self.preload()
+		self.invalidate(RELEASED)
+
 	@functools.cached_property
 	def name(self) -> str:
 		return self.relative_path.as_posix()
@@ -34,138 +159,160 @@ class File:
 
 	@functools.cached_property
 	def contents(self) -> str:
-		contents = self.path.read_text('utf8')
+		raw_contents = self.path.read_bytes()
+		# remember the newlines of the file to write it back with the same ones
+		self.newline = '\r\n' if b'\r\n' in raw_contents else '\n'
+		# translate newlines like `read_text` does
+		contents = raw_contents.decode('utf8').replace('\r\n', '\n').replace('\r', '\n')
 		# camera.py:386 function `reset` has an extra pair of quotes at end of docstring, delete it here before parsing
 		contents = contents.replace('""" ""', '"""')
 		return contents
 
 	@functools.cached_property
-	def line_offsets(self) -> list[int]:
-		return index_lines(self.contents)
+	def line_index(self) -> LineIndex:
+		return LineIndex(self.contents)
 
 	# represents the change `contents[start:stop] = replacement`
-	# the modification is postponed to avoid affecting offsets which were already calculated
-	def register_modification(self, position: slice, replacement: str) -> None:
-		assert position.start <= position.stop and position.step is None
-		modification = (position, replacement)
-		index = bisect.bisect(self.modifications, modification)
-		assert index == len(self.modifications) or position.stop <= self.modifications[index][0].start
-		assert index == 0 or self.modifications[index-1][0].stop <= position.start
-		self.modifications.insert(index, modification)
-
-	# flush the registered modifications
-	def apply_modifications(self) -> None:
+	# the modification is postponed to avoid affecting offsets which were already calculated,
+	# `source` defaults to the one of the context, see `edit_source`
+	def register_modification(self, position: slice, replacement: str, source: typing.Optional[str] = None) -> None:
+		assert position.step is None
+		self.modifications.add(position.start, position.stop, replacement, source)
+
+	# like `register_modification` for each of the modifications, which are only iterated once
+	def register_modifications(self, modifications: typing.Iterable[tuple[slice, str]], source: typing.Optional[str] = None) -> None:
+		for position, replacement in modifications:
+			assert position.step is None
+			self.modifications.add(position.start, position.stop, replacement, source)
+
+	# sort the registered modifications and make sure that none of them overlap
+	def check_modifications(self) -> None:
+		try:
+			self.modifications.sort()
+		except OverlappingEditsError as e:
+			raise OverlappingEditsError(e.edit, e.other_edit, self.name) from None
+
+	# the contents with the registered modifications
+	def modified_contents(self) -> str:
+		self.check_modifications()
+		return apply_modifications(self.contents, self.modifications)
+
+	# flush the registered modifications, the file is written by the writer if given
+	def apply_modifications(self, writer: typing.Optional[FileWriter] = None) -> None:
 		if not self.modifications:
 			return
-		contents = self.contents
-		# applied in reverse order to not mess up offsets
-		for position, replacement in reversed(self.modifications):
-			contents = contents[:position.start] + replacement + contents[position.stop:]
+		contents = self.modified_contents()
 		# write the contents to the file
-		newline = '\r\n' if b'\r\n' in self.path.read_bytes() else '\n'
-		with self.path.open('w', encoding='utf8', newline=newline) as f:
-			f.write(contents)
+		if writer is None:
+			write_file(self.path, contents, self.newline)
+		else:
+			writer.write(self.path, contents, self.newline)
 		# update the contents in memory
 		self.contents = contents
 		self.modifications.clear()
-		# delete the cached properties that rely on the contents
-		_ = (self.line_offsets, self.ast, self.functions, self.exports, self.imports, self.offset_for_adding_imports)
-		del self.line_offsets, self.ast, self.functions, self.exports, self.imports, self.offset_for_adding_imports
+		# the cached properties that rely on the contents are computed again if they're needed
+		self.invalidate(DERIVED_FROM_CONTENTS)
+
+	# forget the cached properties which were computed, without computing the others
+	def invalidate(self, names: typing.Iterable[str]) -> None:
+		for name in names:
+			self.__dict__.pop(name, None)
+
+	# render the registered modifications as a unified diff, relative to the root of the repo
+	def diff(self) -> str:
+		if not self.modifications:
+			return ''
+		old_lines = split_lines(self.path.read_bytes().decode('utf8'))
+		new_lines = split_lines(self.modified_contents().replace('\n', self.newline))
+		diff = []
+		for line in difflib.unified_diff(old_lines, new_lines, f'a/{self.name}', f'b/{self.name}'):
+			diff.append(line)
+			# only the last line of a file can be missing a newline
+			if not line.endswith('\n'):
+				diff.append('\n\\ No newline at end of file\n')
+		return ''.join(diff)
 
 	@functools.cached_property
 	def ast(self) -> ast.Module:
 		return ast.parse(self.contents, self.name)
 
+	# collects everything needed from the ast in a single traversal
 	@functools.cached_property
-	def functions(self) -> list[Func]:
+	def summary(self) -> FileSummary:
+		# may hold lists of `__init__` functions which list their parameters in the docstring of a class, in the place of the class
 		funcs = []
+		exports = set()
+		imports = set()
+		last_import_line = None
+		visited_nodes = 0
+
+		# breadth first like `ast.walk`, with the classes containing each node whose docstrings list the parameters of `__init__`
+		queue = collections.deque([(self.ast, None, ())])
+		while queue:
+			node, parent, documenting_classes = queue.popleft()
+			visited_nodes += 1
 
-		for node in ast.walk(self.ast):
 			if isinstance(node, ast.FunctionDef):
-				funcs.append(Func(self, node))
+				funcs.append(Func.from_node(self, node))
+				if node.name == '__init__':
+					for cls, cls_funcs in documenting_classes:
+						assert ast.get_docstring(node) is None
+						cls_funcs.append(Func.from_node(self, node, node_with_docstring=cls))
 
-			# some __init__ functions list their parameters in the class docstring
 			elif isinstance(node, ast.ClassDef):
-				cls = node
-				class_docstring = ast.get_docstring(cls)
+				# the names of all the classes defined in this file
+				exports.add(node.name)
+				# some __init__ functions list their parameters in the class docstring
+				class_docstring = ast.get_docstring(node)
 				if class_docstring and 'Parameters' in class_docstring:
-					for node2 in ast.walk(cls):
-						if isinstance(node2, ast.FunctionDef) and node2.name == '__init__':
-							func = node2
-							assert ast.get_docstring(func) is None
-							funcs.append(Func(self, func, node_with_docstring=cls))
+					cls_funcs = []
+					funcs.append(cls_funcs)
+					documenting_classes += ((node, cls_funcs),)
 
-		return funcs
+			elif isinstance(node, (ast.Import, ast.ImportFrom)):
+				imports |= imported_names(node)
+				if parent is self.ast:
+					last_import_line = max(last_import_line or 0, node.end_lineno)
+
+			queue.extend((child, node, documenting_classes) for child in ast.iter_child_nodes(node))
+
+		funcs = [func for item in funcs for func in (item if isinstance(item, list) else [item])]
+		return FileSummary(funcs, exports, imports, last_import_line, visited_nodes)
+
+	@functools.cached_property
+	def functions(self) -> list[Func]:
+		return self.summary.functions
 
 	@functools.cached_property
 	def exports(self) -> set[str]:
-		# the names of all the classes define in this file
-		return {node.name for node in ast.walk(self.ast) if isinstance(node, ast.ClassDef)}
+		return self.summary.exports
 
 	@functools.cached_property
 	def imports(self) -> set[str]:
-		imports = set()
-
-		for node in ast.walk(self.ast):
-			if not isinstance(node, (ast.Import, ast.ImportFrom)):
-				continue
-			if isinstance(node, ast.ImportFrom) and node.module == '__future__':
-				continue
-			if isinstance(node, ast.ImportFrom) and node.names[0].name == '*':
-				# `from typing import *` appears in the code so we take advantage of it
-				if node.module == 'typing':
-					imports |= set(dir(typing))
-				# ignore all other star imports
-				continue
-
-			# add the names that this import adds to the global scope
-			imports |= {n.asname or n.name.split('.')[0] for n in node.names}
+		return self.summary.imports
 
-		return imports
+	# the modules imported by the top-level code of the file
+	@functools.cached_property
+	def imported_modules(self) -> list[str]:
+		if self.module_name is None:
+			return []
+		return find_imported_modules(self.ast, self.module_name)
 
 	@functools.cached_property
 	def offset_for_adding_imports(self) -> int:
-		last_import_line = max(
-			node.end_lineno
-			for node in ast.iter_child_nodes(self.ast)
-			if isinstance(node, (ast.Import, ast.ImportFrom))
-		)
+		if self.summary.last_import_line is None:
+			raise ValueError(f'{self.name} has no imports')
 		# the offset of the first line after the last import
-		return self.line_offsets[last_import_line]
+		return self.line_index.line_start(self.summary.last_import_line + 1)
 
 	def add_imports_for_expression(self, expression: str) -> str:
-		expression = ast.parse(expression)
-
-		# find all the names used in the annotation that we need to import
-		builtin_names = set(__builtins__ if isinstance(__builtins__, dict) else dir(__builtins__))
-		already_imported = builtin_names | self.imports | self.exports | self.to_import
-		to_import = {node.id for node in ast.walk(expression) if isinstance(node, ast.Name)}
-		to_import -= already_imported
-
-		class SimplifyImports(ast.NodeTransformer):
-			# in some cases `foo.bar` is used and `foo` is not imported but `bar` is,
-			# so switch the annotation to use `bar` directly
-			def visit_Attribute(self, node):
-				if isinstance(node.value, ast.Name) and node.attr in (already_imported | to_import):
-					if node.value.id in to_import:
-						to_import.remove(node.value.id)
-					return ast.Name(node.attr)
-
-				self.generic_visit(node)
-				return node
-
-			# if `typing` is imported, use it instead of adding more imports
-			def visit_Name(self, node):
-				if node.id not in already_imported and 'typing' in (already_imported | to_import) and node.id in dir(typing):
-					if node.id in to_import:
-						to_import.remove(node.id)
-					return ast.Attribute(ast.Name('typing'), node.id)
-
-				return node
-
-		# simplify imports and update the expression accordingly
-		SimplifyImports().visit(expression)
-		expression = ast.unparse(expression)
+		# only whether the names in the expression are already imported matters, so the result is shared by all the files
+		already_imported = frozenset(
+			name
+			for name in expression_names(expression)
+			if name in BUILTIN_NAMES or name in self.imports or name in self.exports or name in self.to_import
+		)
+		expression, to_import = simplify_imports(expression, already_imported)
 
 		# add to the set of the current file
 		if to_import:
@@ -174,50 +321,101 @@ class File:
 		# return the updated expression
 		return expression
 
-	def register_imports_modification(self, all_files: list[File]) -> None:
+	# returns the modules which the added imports import when the file runs, for updating the export index
+	def register_imports_modification(self, export_index: ExportIndex, import_graph: ImportGraph) -> list[str]:
 		if not self.to_import:
-			return
-
-		# map from name to the name of the module it's defined at
-		name_to_defining_module = {
-			export: file.module_name
-			for file in all_files
-			if file.module_name
-			for export in file.exports
-		}
-		name_to_defining_module = {name: 'typing' for name in dir(typing)} | name_to_defining_module
-		# map from name to an import statement that imports it
-		name_to_import_stmt = {
-			name: f'from {module} import {name}\n'
-			for name, module in name_to_defining_module.items()
-		}
-		name_to_import_stmt |= {'np': 'import numpy as np\n'}
-
-		# if we need to guard cyclic imports, import TYPE_CHECKING
-		if any((self.name, name) in CIRCULAR_IMPORTS for name in self.to_import):
-			type_checking_flag = self.add_imports_for_expression('TYPE_CHECKING')
+			return []
 
 		# separate the imports by whether or not they cause a cyclic import
 		names_to_import = set()
 		names_to_guard = set()
-		for name in self.to_import:
-			if (self.name, name) in CIRCULAR_IMPORTS:
-				names_to_guard.add(name)
-			else:
+		for name in sorted(self.to_import):
+			if self.module_name is None or import_graph.add_import(self.module_name, export_index.imported_module(name)):
 				names_to_import.add(name)
+			else:
+				names_to_guard.add(name)
+
+		# if we need to guard cyclic imports, import TYPE_CHECKING
+		if names_to_guard:
+			type_checking_flag = self.add_imports_for_expression('TYPE_CHECKING')
+			# `TYPE_CHECKING` itself may need to be imported
+			names_to_import |= self.to_import - names_to_guard
 
 		# build a string of imports to add
 		imports = ''
 		# add the normal imports
 		for name in sorted(names_to_import):
-			imports += name_to_import_stmt[name]
+			imports += export_index.import_stmt(name)
 		# add the guarded imports
 		if names_to_guard:
 			imports += f'if {type_checking_flag}:\n'
 			for name in sorted(names_to_guard):
-				imports += '    ' + name_to_import_stmt[name]
+				imports += '    ' + export_index.import_stmt(name)
 
 		# add the imports to the file
-		self.register_modification(slice(self.offset_for_adding_imports, self.offset_for_adding_imports), imports)
+		self.register_modification(slice(self.offset_for_adding_imports, self.offset_for_adding_imports), imports, 'register_imports_modification')
 
 		self.to_import.clear()
+		if self.module_name is None:
+			return []
+		# the guarded imports don't run
+		return [module for name in sorted(names_to_import) for module in export_index.imported_modules(name)]
+
+
+# the file, or only what the export index needs from it if `prescan` and the lexical scan finds nothing to fix in it
+def load_file(path: pathlib.Path, relative_path: pathlib.Path, cache: typing.Optional[ParseCache] = None, prescan: bool = False) -> File | ScannedFile:
+	file = File(path, relative_path)
+	if prescan and (scanned_file := ScannedFile.from_file(file)) is not None:
+		return scanned_file
+	if cache is not None:
+		# the contents which were read for the scan aren't read again
+		return cache.load(file)
+	return file
+
+
+def _load_file(path: pathlib.Path, relative_path: pathlib.Path, cache: typing.Optional[ParseCache] = None, prescan: bool = False) -> File | ScannedFile:
+	file = load_file(path, relative_path, cache, prescan)
+	return file.preload() if isinstance(file, File) else file
+
+
+# load and parse the files, with multiple processes if `jobs > 1`, if `prescan` the files which have nothing to fix aren't parsed,
+# the paths can be yielded while they're found, the files are loaded as they come
+def load_files(
+	paths: typing.Iterable[pathlib.Path],
+	root: pathlib.Path,
+	jobs: int = 1,
+	cache: typing.Optional[ParseCache] = None,
+	prescan: bool = False,
+) -> list[File | ScannedFile]:
+	if jobs <= 1:
+		return [load_file(path, path.relative_to(root), cache, prescan) for path in paths]
+	# the number of paths which are still being found isn't known, and each chunk is submitted once it's full
+	chunksize = max(1, len(paths) // (jobs * 4)) if isinstance(paths, list) else 16
+	paths, relative_paths = itertools.tee(paths)
+	relative_paths = (path.relative_to(root) for path in relative_paths)
+	with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+		# the results are in the same order as the paths, so the output is identical to loading serially
+		return list(executor.map(_load_file, paths, relative_paths, itertools.repeat(cache), itertools.repeat(prescan), chunksize=chunksize))
+
+
+# load and parse the files like `load_files`, yielding them one by one in the same order,
+# with `jobs > 1` the processes load a few files ahead of the one which was yielded last, and only these are kept
+def iter_files(
+	paths: typing.Iterable[pathlib.Path],
+	root: pathlib.Path,
+	jobs: int = 1,
+	cache: typing.Optional[ParseCache] = None,
+	prescan: bool = False,
+) -> typing.Iterator[File | ScannedFile]:
+	if jobs <= 1:
+		for path in paths:
+			yield load_file(path, path.relative_to(root), cache, prescan)
+		return
+	with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+		pending = collections.deque()
+		for path in paths:
+			pending.append(executor.submit(_load_file, path, path.relative_to(root), cache, prescan))
+			if len(pending) > jobs * 2:
+				yield pending.popleft().result()
+		while pending:
+			yield pending.popleft().result()
@@ -1,13 +1,30 @@
 from __future__ import annotations
 import argparse
 
-import ast
+import collections
+import contextlib
 import pathlib
+import sys
+import time
+import traceback
+import typing
 
-from file import File
+from batch import RepoSummary, format_summary, read_manifest
+from cache import DEFAULT_CACHE_DIR, MAX_MEMORY_CACHE_SIZE, SCRIPT_VERSION, ParseCache
+from discovery import DEFAULT_EXCLUDE, DEFAULT_INCLUDE, SourceFinder
+from edits import edit_source
+from exports import ExportIndex, FileExports
+from file import RELEASED, File, iter_files, load_files
+from import_graph import ImportGraph
+from incremental import find_changed_files, load_changed_files
+from prescan import verify_scan
+from profiling import Profiler
+from rule_stats import RuleCounters
 from func import Func
-from special_cases import NAME_REPLACEMENTS, SPECIAL_CASES_FOR_COMPARING_TYPES, SPECIAL_CASES_FOR_CONVERTING_TYPES
+from special_case_tables import MANIM_SPECIAL_CASES, SPECIAL_CASES_PATH, SpecialCases, load_special_cases
 from utils import cleanup_type, get_indent_size_at, zip_dicts
+from watch import changed_names, file_mtimes, record_mtimes, scan_mtimes
+from writer import FileWriter
 
 
 # marker to add for further investigation (for grepping later)
@@ -15,50 +32,362 @@ MAGIC_MARKER = 'TODO TYPEHINTS'
 
 def main():
 	parser = argparse.ArgumentParser()
-	parser.add_argument('manim_root', type=pathlib.Path)
+	parser.add_argument('manim_roots', metavar='manim_root', type=pathlib.Path, nargs='*', help='the root of a manim repo, or of each repo to fix in a batch')
+	parser.add_argument('--manifest', metavar='FILE', type=pathlib.Path, help='fix the repos listed in FILE in a batch, one root per line relative to FILE')
+	parser.add_argument('-j', '--jobs', type=int, default=1, help='number of processes to load and parse the files with')
+	parser.add_argument('--no-cache', action='store_true', help="don't use the cache of parsed files from previous runs")
+	parser.add_argument('--since', metavar='GIT_REF', help='only fix the files changed since GIT_REF and the files which may need to import from them')
+	parser.add_argument('--profile', metavar='REPORT', type=pathlib.Path, help='write a JSON report of the time and memory used by each phase and fixer to REPORT')
+	parser.add_argument('--include', metavar='GLOB', action='append', default=[], help='fix the files matching GLOB instead of all the .py files, can be given more than once')
+	parser.add_argument('--exclude', metavar='GLOB', action='append', default=[], help="don't fix the files or enter the directories matching GLOB, can be given more than once")
+	parser.add_argument('--no-gitignore', action='store_true', help="fix the files ignored by .gitignore files too")
+	parser.add_argument('--no-prescan', action='store_true', help='parse every file, including the ones which a quick scan finds nothing to fix in')
+	parser.add_argument('--verify-prescan', action='store_true', help='parse every file and check that the quick scan finds the same classes and imports, fails if it does not')
+	parser.add_argument('--rule-stats', metavar='REPORT', type=pathlib.Path, help='write a JSON report of how often each type cleanup and special case is used and how long the cleanups take to REPORT, with the unused ones')
+	parser.add_argument('--low-memory', action='store_true', help='fix the files one by one and only keep what is needed for adding imports in memory')
+	parser.add_argument('--write-jobs', type=int, default=4, help='number of threads to write the files with')
+	parser.add_argument('--dry-run', action='store_true', help="don't modify the files")
+	parser.add_argument('--special-cases', metavar='FILE', type=pathlib.Path, action='append', default=[], help='read more special cases from a TOML or JSON file, can be given more than once')
+	parser.add_argument('--diff', metavar='PATCH', nargs='?', const='-', help="write a unified diff of the changes to PATCH (default stdout) instead of modifying the files")
+	parser.add_argument('--watch', metavar='SECONDS', type=float, nargs='?', const=0.25, help='keep running and fix the files again when they or the special cases change, checking every SECONDS (default 0.25)')
 	args = parser.parse_args()
-	assert (args.manim_root / 'README.md').is_file(), 'The given folder is not the root of a manim repo'
+	roots = args.manim_roots + (read_manifest(args.manifest) if args.manifest is not None else [])
+	if not roots:
+		parser.error('no manim root given')
+	for root in roots:
+		assert (root / 'README.md').is_file(), f'{root} is not the root of a manim repo'
+	assert not (args.since and args.no_cache), '--since needs the export index from the cache'
+	assert not (args.since and args.watch is not None), '--watch already only fixes the changed files'
+	if len(roots) > 1 or args.manifest is not None:
+		assert not (args.watch is not None or args.diff or args.profile or args.rule_stats), '--watch, --diff, --profile and --rule-stats only work with a single repo'
+		sys.exit(0 if batch(args, roots) else 1)
+	args.manim_root = roots[0]
+
+	if args.diff == '-':
+		# keep stdout clean for the diff
+		diff_output = sys.stdout
+		with contextlib.redirect_stdout(sys.stderr):
+			succeeded = watch(args, diff_output) if args.watch is not None else run(args, diff_output)
+	elif args.diff is not None:
+		with open(args.diff, 'w', encoding='utf8', newline='') as diff_output:
+			succeeded = watch(args, diff_output) if args.watch is not None else run(args, diff_output)
+	else:
+		succeeded = watch(args) if args.watch is not None else run(args)
+	if not succeeded:
+		sys.exit(1)
+
+
+# finds the files to fix under the root, the globs have the syntax of .gitignore
+def source_finder(args: argparse.Namespace) -> SourceFinder:
+	return SourceFinder(args.manim_root, tuple(args.include) or DEFAULT_INCLUDE, (*DEFAULT_EXCLUDE, *args.exclude), not args.no_gitignore)
+
+
+# fix the files which changed and the files which may need to import from them whenever files change, until interrupted,
+# the export index is kept in memory between the runs
+def watch(args: argparse.Namespace, diff_output: typing.Optional[typing.TextIO] = None) -> bool:
+	cache = None if args.no_cache else ParseCache()
+	finder = source_finder(args)
+	prescan = not args.no_prescan and not args.verify_prescan
+	special_case_paths = [SPECIAL_CASES_PATH, *args.special_cases]
+	special_case_mtimes = file_mtimes(special_case_paths)
+	loaded_special_cases = load_special_cases(args.special_cases)
+	export_index = ExportIndex({})
+	mtimes = {}
+	# the files of a failed run, to fix again in the next one
+	pending_names = set()
+
+	try:
+		while True:
+			new_mtimes = scan_mtimes(finder)
+			names = changed_names(mtimes, new_mtimes)
+			mtimes = new_mtimes
+
+			# only the files with functions whose special cases changed need to be fixed again
+			if file_mtimes(special_case_paths) != special_case_mtimes:
+				special_case_mtimes = file_mtimes(special_case_paths)
+				try:
+					new_special_cases = load_special_cases(args.special_cases, reload=True)
+				except Exception:
+					traceback.print_exc()
+				else:
+					names |= {file for file, func in loaded_special_cases.changed_functions(new_special_cases) if file in mtimes}
+					loaded_special_cases = new_special_cases
+
+			if not names:
+				time.sleep(args.watch)
+				continue
+			# try the files which failed again, since the change may have fixed them
+			names |= pending_names
+
+			start_time = time.perf_counter()
+			files = []
+			try:
+				files, updated_export_index = load_changed_files(args.manim_root, sorted(names), export_index, cache, args.jobs, prescan)
+				# the files which were written get their new times, so they aren't fixed again,
+				# the files which were saved again during the run aren't written and keep their old times, so they're fixed again
+				succeeded = run(args, diff_output, files, updated_export_index, loaded_special_cases, mtimes=mtimes)
+			except Exception:
+				traceback.print_exc()
+				succeeded = False
+			if succeeded:
+				export_index = updated_export_index
+				pending_names = set()
+			else:
+				pending_names = names
+			print(f'{"Fixed" if succeeded else "Failed to fix"} {len(files)} files in {time.perf_counter() - start_time:.2f}s, watching for changes...')
+	except KeyboardInterrupt:
+		return not pending_names
+
+
+# fix several repos one after the other in this process, returns whether all of them were fixed,
+# the memoized type cleanups and imports and the special cases stay warm between the repos,
+# and the files which are identical in several repos are parsed once, see `ParseCache`
+def batch(args: argparse.Namespace, roots: list[pathlib.Path]) -> bool:
+	start_time = time.perf_counter()
+	special_cases = load_special_cases(args.special_cases)
+	cache = ParseCache(directory=None if args.no_cache else DEFAULT_CACHE_DIR, memory_size=MAX_MEMORY_CACHE_SIZE)
+	summaries = []
+	for root in roots:
+		print(f'==> {root}')
+		summary = RepoSummary(root)
+		repo_start_time = time.perf_counter()
+		try:
+			summary.succeeded = run(argparse.Namespace(**vars(args) | {'manim_root': root}), special_cases=special_cases, cache=cache, summary=summary)
+		except Exception as e:
+			traceback.print_exc()
+			summary.error = type(e).__name__
+		summary.seconds = time.perf_counter() - repo_start_time
+		summaries.append(summary)
+	if cache.directory is not None:
+		cache.evict()
+
+	print(format_summary(summaries, time.perf_counter() - start_time))
+	if cache.memory_hits:
+		print(f'Reused {cache.memory_hits} parsed files which are identical to files of a previous repo')
+	return all(summary.succeeded for summary in summaries)
+
+
+# fix the files and write them, returns whether all the files were written,
+# `files_to_fix` and `export_index` are given when the files to fix were already loaded,
+# `cache` is given to share it between runs, and `summary` is filled with the results of the run,
+# `mtimes` are the modification times of the files by name when they were found, which the run records itself if they're
+# not given, a file which was modified since is not written, and the times of the files which were written are updated
+def run(
+	args: argparse.Namespace,
+	diff_output: typing.Optional[typing.TextIO] = None,
+	files_to_fix: typing.Optional[list[File]] = None,
+	export_index: typing.Optional[ExportIndex] = None,
+	special_cases: typing.Optional[SpecialCases] = None,
+	cache: typing.Optional[ParseCache] = None,
+	summary: typing.Optional[RepoSummary] = None,
+	mtimes: typing.Optional[dict[str, int]] = None,
+) -> bool:
+
+	profiler = Profiler(enabled=args.profile is not None)
+	# a cache which is shared between runs is evicted once they're all done
+	evict_cache = cache is None
+	if cache is None and not args.no_cache:
+		cache = ParseCache()
+	if special_cases is None:
+		special_cases = load_special_cases(args.special_cases)
+	# the files which a scan finds nothing to fix in are not parsed, unless the scan is verified against parsing them
+	prescan = not args.no_prescan and not args.verify_prescan
+	rule_counters = None
+	if args.rule_stats is not None:
+		rule_counters = RuleCounters()
+		cleanup_type.count_rules(rule_counters)
+		special_cases.count_rules(rule_counters)
 
-	# load and parse all files
 	print('Loading...')
-	files = [File(file, file.relative_to(args.manim_root)) for file in args.manim_root.glob('**/*.py')]
-	print(f'\tTotal files: {len(files)}')
-	funcs = [func for file in files for func in file.functions]
-	print(f'\tTotal functions: {len(funcs)}')
-	print(f'\tTotal parameters: {sum(len(f.func_args) for f in funcs)}')
-	funcs_with_docstring = [f for f in funcs if f.has_docstring]
-	print(f'\tTotal functions with a docstring: {len(funcs_with_docstring)}')
-	funcs_with_params_in_docstring = [f for f in funcs_with_docstring if f.doc_args]
-	print(f'\tTotal functions with parameters in their docstring: {len(funcs_with_params_in_docstring)}')
-	print(f'\tTotal parameters in docstrings: {sum(len(f.doc_args) for f in funcs_with_params_in_docstring)}')
-	funcs_with_param_types_in_docstring = [f for f in funcs_with_params_in_docstring if any(arg.type for arg in f.doc_args.values())]
-	print(f'\tTotal functions with parameter types in their docstring: {len(funcs_with_param_types_in_docstring)}')
-	print(f'\tTotal parameter types in docstrings: {sum(1 for f in funcs_with_params_in_docstring for arg in f.doc_args.values() if arg.type)}')
-
-	# fix the functions
+	finder = None
+	if files_to_fix is not None:
+		# already loaded, so they're used in the place of the paths
+		paths = files_to_fix
+	elif args.since is None:
+		# the files are loaded while the rest of the tree is walked
+		finder = source_finder(args)
+		paths = finder.find()
+		if mtimes is None:
+			# saved with the export index
+			mtimes = {}
+			paths = record_mtimes(paths, args.manim_root, mtimes)
+	else:
+		# the changed files are only fixed if a full run would fix them
+		paths, export_index = find_changed_files(args.manim_root, args.since, cache, source_finder(args), args.jobs, prescan)
+		if mtimes is None:
+			mtimes = export_index.mtimes
+	if args.low_memory:
+		# the files are loaded, fixed and released one by one, with `--jobs` the next ones are loaded ahead by the same processes
+		loaded_files = paths if files_to_fix is not None else iter_files(paths, args.manim_root, args.jobs, cache, prescan)
+		batches = ([f] for f in profiler.measure_iter('phases', 'loading', loaded_files))
+	else:
+		batches = [paths]
+
+	files = []
+	file_exports = {}
+	stats = collections.Counter()
+	prescan_differences = []
+	fixed_unknown_args = marked_unknown_args = fixed_args_with_redundant_types = fixed_args_with_no_type_annotation = 0
+	for batch in batches:
+		# load and parse the files
+		with profiler.measure('phases', 'loading'):
+			batch_files = batch if files_to_fix is not None or args.low_memory else load_files(batch, args.manim_root, args.jobs, cache, prescan)
+			# the other files were only scanned, they have nothing to fix
+			parsed_files = [f for f in batch_files if isinstance(f, File)]
+			if profiler.enabled:
+				# parse the files here to measure each of them, instead of when they are first used
+				for f in parsed_files:
+					with profiler.measure_file(f.name):
+						f.preload()
+			file_exports |= {f.name: FileExports.from_file(f) for f in batch_files}
+			stats['Total files'] += len(batch_files)
+			if prescan:
+				stats['Total files with nothing to fix, which were not parsed'] += len(batch_files) - len(parsed_files)
+			if args.verify_prescan:
+				prescan_differences += [f'{f.name}: {difference}' for f in parsed_files for difference in verify_scan(f)]
+			funcs = [func for file in batch_files for func in file.functions]
+			# the functions of the files which were only scanned aren't known, but none of them has parameters in its docstring
+			in_parsed_files = ' in the parsed files' if prescan else ''
+			stats[f'Total functions{in_parsed_files}'] += len(funcs)
+			stats[f'Total parameters{in_parsed_files}'] += sum(len(f.func_args) for f in funcs)
+			funcs_with_docstring = [f for f in funcs if f.has_docstring]
+			stats[f'Total functions with a docstring{in_parsed_files}'] += len(funcs_with_docstring)
+			funcs_with_params_in_docstring = [f for f in funcs_with_docstring if f.doc_args]
+			stats['Total functions with parameters in their docstring'] += len(funcs_with_params_in_docstring)
+			stats['Total parameters in docstrings'] += sum(len(f.doc_args) for f in funcs_with_params_in_docstring)
+			funcs_with_param_types_in_docstring = [f for f in funcs_with_params_in_docstring if any(arg.type for arg in f.doc_args.values())]
+			stats['Total functions with parameter types in their docstring'] += len(funcs_with_param_types_in_docstring)
+			stats['Total parameter types in docstrings'] += sum(1 for f in funcs_with_params_in_docstring for arg in f.doc_args.values() if arg.type)
+		# with a single batch all the files were loaded, so the statistics are shown even if a fixer fails
+		if not args.low_memory:
+			print_loading_stats(stats, finder, prescan_differences if args.verify_prescan else None)
+
+		# fix the functions
+		with profiler.measure('phases', 'fixing'):
+			with profiler.measure('fixers', 'fix_unknown_args'), edit_source('fix_unknown_args'):
+				fixed, marked = fix_unknown_args(funcs_with_params_in_docstring, special_cases)
+				fixed_unknown_args += fixed
+				marked_unknown_args += marked
+			with profiler.measure('fixers', 'fix_args_with_redundant_types'), edit_source('fix_args_with_redundant_types'):
+				fixed_args_with_redundant_types += fix_args_with_redundant_types(funcs_with_param_types_in_docstring, special_cases)
+			with profiler.measure('fixers', 'fix_args_with_no_type_annotation'), edit_source('fix_args_with_no_type_annotation'):
+				fixed_args_with_no_type_annotation += fix_args_with_no_type_annotation(funcs_with_param_types_in_docstring, special_cases)
+			# fail on overlapping edits before any file is written or output
+			for f in parsed_files:
+				f.check_modifications()
+
+		if args.low_memory:
+			for f in parsed_files:
+				f.release()
+		files += parsed_files
+
+	if args.low_memory:
+		print_loading_stats(stats, finder, prescan_differences if args.verify_prescan else None)
 	print('Fixing...')
-	fix_unknown_args(funcs_with_params_in_docstring)
-	fix_args_with_redundant_types(funcs_with_param_types_in_docstring)
-	fix_args_with_no_type_annotation(funcs_with_param_types_in_docstring)
+	print(f'\tFixed {fixed_unknown_args} unknown args, marked {marked_unknown_args} unknown args for inspection')
+	print(f'\tFixed {fixed_args_with_redundant_types} args with redundant types')
+	print(f'\tFixed {fixed_args_with_no_type_annotation} args with no type annotation')
+
+	if export_index is None:
+		export_index = ExportIndex(file_exports)
+	import_graph = ImportGraph.from_index(export_index)
 
 	# apply the changes
 	print('Writing...')
-	for f in files:
-		f.register_imports_modification(files)
-	files_modified = len([f.apply_modifications() for f in files if f.modifications])
-	print(f'\tTotal files modified: {files_modified}')
+	expected_mtimes = {args.manim_root / name: mtime for name, mtime in mtimes.items()} if mtimes is not None else {}
+	with profiler.measure('phases', 'writing'), FileWriter(args.write_jobs, expected_mtimes) as writer:
+		files_modified = 0
+		# the modules imported by the imports which were added to each file
+		added_imported_modules = {}
+		for f in files:
+			with profiler.measure_file(f.name):
+				added_imported_modules[f.name] = f.register_imports_modification(export_index, import_graph)
+				if not f.modifications:
+					continue
+				# the modifications of the file are final, so output them right away
+				if diff_output is not None:
+					diff_output.write(f.diff())
+					diff_output.flush()
+				elif not args.dry_run:
+					f.apply_modifications(writer)
+				if args.low_memory:
+					# the file is done, so the rest is dropped without being computed again, unlike `release` would
+					f.invalidate(RELEASED)
+				files_modified += 1
+		if export_index.ambiguous_imports:
+			print(f'\tImported {len(export_index.ambiguous_imports)} names which are defined in more than one module:')
+			for name, module in sorted(export_index.ambiguous_imports.items()):
+				print(f'\t\t{name} from {module}, also defined in {", ".join(export_index.name_to_defining_modules[name][:-1])}')
+		if import_graph.rejected_imports:
+			print(f'\tGuarded {len(import_graph.rejected_imports)} imports with TYPE_CHECKING to avoid circular imports:')
+			for module, imported_module in import_graph.rejected_imports:
+				print(f'\t\t{module} importing {imported_module}')
+	# after all the writes finished
+	if writer.files_written:
+		print(f'\tWrote {writer.bytes_written} bytes in {writer.elapsed_time:.2f}s ({writer.throughput / 1024 / 1024:.1f} MB/s)')
+	if writer.failures:
+		print(f'\tFailed to write {len(writer.failures)} files:')
+		for path, error in writer.failures.items():
+			print(f'\t\t{path.relative_to(args.manim_root).as_posix()}: {error}')
+	print(f'\tTotal files {"to modify" if diff_output is not None or args.dry_run else "modified"}: {files_modified - len(writer.failures)}')
+
+	if mtimes is not None:
+		mtimes |= {path.relative_to(args.manim_root).as_posix(): mtime for path, mtime in writer.written_mtimes.items()}
+
+	# the index is kept by `--watch` and saved for `--since`, so it needs the imports which were written to the files,
+	# for finding the cycles which the next imports would create
+	if diff_output is None and not args.dry_run:
+		for f in files:
+			if added_imported_modules[f.name] and f.path not in writer.failures:
+				export_index.add_imported_modules(f.name, added_imported_modules[f.name])
+	if cache is not None and cache.directory is not None:
+		# the files which were modified since are loaded again by `--since`
+		export_index.mtimes = mtimes if mtimes is not None else {}
+		export_index.save(cache.export_index_path(args.manim_root))
+		if evict_cache:
+			cache.evict()
+
+	if rule_counters is not None:
+		cleanup_type.count_rules(None)
+		special_cases.count_rules(None)
+		rule_counters.save(args.rule_stats, version=SCRIPT_VERSION)
+		unused_rules = rule_counters.unused_rules()
+		print(f'\tRule stats written to {args.rule_stats}, unused: ' + ', '.join(f'{len(names)} of {len(rule_counters.sections[section])} {section}' for section, names in unused_rules.items()))
+	if profiler.enabled:
+		profiler.save(args.profile, version=SCRIPT_VERSION, files=len(files), functions=stats['Total functions'])
+		print(f'\tProfile written to {args.profile}')
+	if summary is not None:
+		summary.files = stats['Total files']
+		summary.parsed_files = len(files)
+		summary.fixed_args = fixed_unknown_args + fixed_args_with_redundant_types + fixed_args_with_no_type_annotation
+		summary.marked_args = marked_unknown_args
+		summary.modified_files = files_modified - len(writer.failures)
+		summary.failed_files = len(writer.failures)
 	print('Done.')
+	return not writer.failures and not prescan_differences
+
+
+# the statistics of the loaded files, with the differences between the quick scan and parsing if the scan was verified
+def print_loading_stats(stats: collections.Counter, finder: typing.Optional[SourceFinder], prescan_differences: typing.Optional[list[str]]) -> None:
+	for name, count in stats.items():
+		print(f'\t{name}: {count}')
+	if finder is not None and (finder.skipped_directories or finder.skipped_files):
+		print(f'\tSkipped {finder.skipped_directories} directories and {finder.skipped_files} files which are excluded or ignored')
+	if prescan_differences is not None:
+		print(f'\tThe quick scan differs from parsing {len(prescan_differences)} times{":" if prescan_differences else ""}')
+		for difference in prescan_differences:
+			print(f'\t\t{difference}')
 
 
 # args which are only mentioned in the docstring but no such arg exists in the function => put a marker
-def fix_unknown_args(funcs: list[Func]):
+def fix_unknown_args(funcs: list[Func], special_cases: SpecialCases = MANIM_SPECIAL_CASES) -> tuple[int, int]:
 	fixed = 0
 	marked = 0
 	for f in funcs:
 		# is only in docstring but not in the function
 		for name, doc_arg in list(f.doc_args.items()):
 			if name not in f.func_args:
-				new_name = NAME_REPLACEMENTS.get((f.file.name, f.func.name, name))
+				new_name = special_cases.name_replacement(f.file.name, f.name, name)
 
 				if new_name is not None:
 					if new_name:
@@ -70,20 +399,22 @@ def fix_unknown_args(funcs: list[Func]):
 				else:
 					# add a marker in a comment on the next line for further investigation
 					indent = get_indent_size_at(f.file.contents, doc_arg.position.start)
-					f.file.register_modification(
-						slice(doc_arg.annotation_position.stop, doc_arg.annotation_position.stop),
-						f'\n{" " * (indent + 4)}# {MAGIC_MARKER}',
-					)
+					marker = f'\n{" " * (indent + 4)}# {MAGIC_MARKER}'
+					# the marker may be there from a previous run
+					if not f.file.contents.startswith(marker, doc_arg.annotation_position.stop):
+						f.file.register_modification(slice(doc_arg.annotation_position.stop, doc_arg.annotation_position.stop), marker)
 
 					marked += 1
 
-	print(f'\tFixed {fixed} unknown args, marked {marked} unknown args for inspection')
+	return fixed, marked
 
 
 # args have a type both in the docstring and in a type annotation => delete the type in the docstring
-def fix_args_with_redundant_types(funcs: list[Func]):
+def fix_args_with_redundant_types(funcs: list[Func], special_cases: SpecialCases = MANIM_SPECIAL_CASES) -> int:
 	fixed = 0
 	for f in funcs:
+		# the modifications of the function are registered together
+		modifications = []
 		for name, (func_arg, doc_arg) in zip_dicts(f.func_args, f.doc_args).items():
 			# has a type both in the docstring and in a type annotation
 			if func_arg.type and doc_arg.type:
@@ -93,20 +424,23 @@ def fix_args_with_redundant_types(funcs: list[Func]):
 				# verify the types are identical or in the other cases we know
 				assert (
 					clean_doc_arg == clean_func_arg or
-					(f.file.name, f.func.name, name, clean_func_arg, clean_doc_arg) in SPECIAL_CASES_FOR_COMPARING_TYPES
+					special_cases.types_match(f.file.name, f.name, name, clean_func_arg, clean_doc_arg)
 				), f'[{f}][arg {name}] {func_arg.type} VS {doc_arg.type} CLEANED TO {clean_func_arg} VS {clean_doc_arg}'
 				# delete the type in the docstring
-				doc_arg.delete_annotation()
+				modifications.append(doc_arg.annotation_deletion())
 
 				fixed += 1
+		f.file.register_modifications(modifications)
 
-	print(f'\tFixed {fixed} args with redundant types')
+	return fixed
 
 
 # args which have a type in the docstring and no type annotation => convert the docstring type to an annotation and delete it
-def fix_args_with_no_type_annotation(funcs: list[Func]):
+def fix_args_with_no_type_annotation(funcs: list[Func], special_cases: SpecialCases = MANIM_SPECIAL_CASES) -> int:
 	fixed = 0
 	for f in funcs:
+		# the modifications of the function are registered together
+		modifications = []
 		for name, (func_arg, doc_arg) in zip_dicts(f.func_args, f.doc_args).items():
 			# has a type in the docstring but no type annotation
 			if not func_arg.type and doc_arg.type:
@@ -115,26 +449,27 @@ def fix_args_with_no_type_annotation(funcs: list[Func]):
 					# clean up the type from the docstring
 					replacement = cleanup_type(doc_arg.type)
 					# special cases
-					replacement = SPECIAL_CASES_FOR_CONVERTING_TYPES.get((f.file.name, f.func.name, name, replacement), replacement)
+					replacement = special_cases.converted_type(f.file.name, f.name, name, replacement)
 
 					# if the replacement is empty don't add an annotation
 					if replacement:
 						# add `| None` if this argument has a default which is `None`
-						if isinstance(func_arg.default, ast.Constant) and func_arg.default.value is None:
+						if func_arg.default == 'None':
 							replacement = f'{replacement} | None'
 
 						# add imports for the type annotation in the current file
 						replacement = f.file.add_imports_for_expression(replacement)
 
 						# add the type annotation
-						func_arg.set_annotation(replacement)
+						modifications.append(func_arg.annotation_addition(replacement))
 
 				# delete the type in the docstring
-				doc_arg.delete_annotation()
+				modifications.append(doc_arg.annotation_deletion())
 
 				fixed += 1
+		f.file.register_modifications(modifications)
 
-	print(f'\tFixed {fixed} args with no type annotation')
+	return fixed
 
 
 if __name__ == '__main__':
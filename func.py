@@ -12,26 +12,69 @@ if typing.TYPE_CHECKING:
 	from file import File
 
 
-@dataclasses.dataclass
+SECTION_HEADER_REGEX = re.compile(r'^ *(\w[ \w]*)\n *-+\n+', flags=re.MULTILINE)
+NEWLINES_REGEX = re.compile(r'\n*')
+
+# the end of a section whose header is indented by `indent_size`
+@functools.lru_cache
+def section_end_regex(indent_size: int) -> re.Pattern:
+	return re.compile(rf'(?<=\n)(\n*)( {{,{indent_size}}}(\w[ \w]*\n *-+\n|\.\. [\w-]+::|To create a tuple)| *$)|, an integer')
+
+# a param in the parameters section, whose lines are indented by `param_indent`
+@functools.lru_cache
+def param_regex(param_indent: int) -> re.Pattern:
+	return re.compile(rf'^ {{{param_indent}}}\**(\w+) ?:?(?: (.+))?$', flags=re.MULTILINE)
+
+
+@dataclasses.dataclass(slots=True)
 class Func:
 	file: File
-	func: ast.FunctionDef
-	# node that may hold the docstring for the func
-	node_with_docstring: typing.Optional[ast.AST] = None
+	name: str
+	lineno: int
+	# the position of the docstring in the file without the quotes, may be the docstring of the class for `__init__`
+	docstring_start: typing.Optional[int]
+	docstring_stop: typing.Optional[int]
+	func_args: dict[str, FuncArg] = dataclasses.field(init=False, default_factory=dict)
+	# computed lazily by `doc_args`
+	_doc_args: typing.Optional[dict[str, DocArg]] = dataclasses.field(init=False, default=None, repr=False)
+	# computed lazily by `docstring_section_headers` and `find_docstring_section`
+	_docstring_section_headers: typing.Optional[dict[str, slice]] = dataclasses.field(init=False, default=None, repr=False)
+	_docstring_sections: typing.Optional[dict[str, tuple[slice, slice, slice]]] = dataclasses.field(init=False, default=None, repr=False)
+
+	# keeps only what's needed from the ast nodes, so they can be freed
+	@classmethod
+	def from_node(cls, file: File, func: ast.FunctionDef, node_with_docstring: typing.Optional[ast.AST] = None) -> Func:
+		# the docstring is of the func itself by default
+		if node_with_docstring is None:
+			node_with_docstring = func
+
+		docstring_start = docstring_stop = None
+		if ast.get_docstring(node_with_docstring, clean=False) is not None:
+			docstring_node = node_with_docstring.body[0]
+			pos = file.line_index.offset(docstring_node.lineno, docstring_node.col_offset)
+			endpos = file.line_index.offset(docstring_node.end_lineno, docstring_node.end_col_offset)
+			if file.contents[pos] == 'r': # raw string
+				pos += 1
+			assert file.contents[pos:pos+3] == '"""', f'{func.name} @ {file.name}:{func.lineno}'
+			assert file.contents[endpos-3:endpos] == '"""', f'{func.name} @ {file.name}:{func.lineno}'
+			docstring_start, docstring_stop = pos + 3, endpos - 3
 
-	def __post_init__(self) -> None:
-		# default is func itself
-		if self.node_with_docstring is None:
-			self.node_with_docstring = self.func
+		self = cls(file, func.name, func.lineno, docstring_start, docstring_stop)
+		self.func_args = self.parse_func_args(func.args)
+		return self
 
 	def __str__(self) -> str:
-		return f'{self.__class__.__name__}({self.func.name} @ {self.file.name}:{self.func.lineno})'
+		return f'{self.__class__.__name__}({self.name} @ {self.file.name}:{self.lineno})'
 
-	@functools.cached_property
+	# compute everything that is computed lazily
+	def preload(self) -> None:
+		_ = self.doc_args
+
+	@property
 	def has_docstring(self) -> bool:
-		return ast.get_docstring(self.node_with_docstring, clean=False) is not None
+		return self.docstring_start is not None
 
-	@functools.cached_property
+	@property
 	def docstring(self) -> typing.Optional[str]:
 		if not self.has_docstring:
 			return None
@@ -39,37 +82,68 @@ class Func:
 		# which is a problem when we try to modify the file based on it
 		return self.file.contents[self.docstring_position]
 
-	@functools.cached_property
+	@property
 	def docstring_position(self) -> typing.Optional[slice]:
 		if not self.has_docstring:
 			return None
-		docstring_node = self.node_with_docstring.body[0]
-		pos = self.file.line_offsets[docstring_node.lineno - 1] + docstring_node.col_offset
-		endpos = self.file.line_offsets[docstring_node.end_lineno - 1] + docstring_node.end_col_offset
-		if self.file.contents[pos] == 'r': # raw string
-			pos += 1
-		assert self.file.contents[pos:pos+3] == '"""', str(self)
-		assert self.file.contents[endpos-3:endpos] == '"""', str(self)
-		return slice(pos+3, endpos-3)
+		return slice(self.docstring_start, self.docstring_stop)
 
-	def find_docstring_section(self, title: str) -> typing.Optional[tuple[slice, slice, slice]]:
+	# the positions of the headers of the sections of the docstring by their title, scanned once for all the sections
+	@property
+	def docstring_section_headers(self) -> dict[str, slice]:
+		if self._docstring_section_headers is None:
+			self._docstring_section_headers = self.scan_docstring_section_headers()
+		return self._docstring_section_headers
+
+	def scan_docstring_section_headers(self) -> dict[str, slice]:
 		if not self.has_docstring:
-			return None
-		section_header_regex = re.compile(rf'^ *{title}\n *-+\n+', flags=re.MULTILINE)
-		section_header = section_header_regex.search(self.file.contents, self.docstring_position.start, self.docstring_position.stop)
-		if section_header is None:
+			return {}
+		contents = self.file.contents
+		headers = {}
+		# underlines are rare, so find them first instead of trying to match a header at every line
+		pos = self.docstring_start
+		while (underline_end := contents.find('-\n', pos, self.docstring_stop)) != -1:
+			pos = underline_end + 2
+			# the title is on the line before the underline
+			underline_start = contents.rfind('\n', self.docstring_start, underline_end)
+			if underline_start == -1:
+				continue
+			title_start = contents.rfind('\n', self.docstring_start, underline_start) + 1 or self.docstring_start
+			section_header = SECTION_HEADER_REGEX.match(contents, title_start, self.docstring_stop)
+			if section_header is None or section_header.end() <= underline_end:
+				continue
+			pos = section_header.end()
+			# only the first section with each title counts
+			headers.setdefault(section_header.group(1), slice(*section_header.span()))
+		return headers
+
+	# the positions of the header, the contents and the footer of a section, the end of a section is only searched for once
+	def find_docstring_section(self, title: str) -> typing.Optional[tuple[slice, slice, slice]]:
+		section_header_position = self.docstring_section_headers.get(title)
+		if section_header_position is None:
 			# section not found
 			return None
-		section_header_position = slice(*section_header.span())
-		indent_size = get_indent_size_at(self.file.contents, section_header_position.start)
-		section_end_regex = re.compile(rf'(?<=\n)(\n*)( {{,{indent_size}}}(\w[ \w]*\n *-+\n|\.\. [\w-]+::|To create a tuple)| *$)|, an integer')
-		section_end = section_end_regex.search(self.file.contents, section_header_position.stop, self.docstring_position.stop).start()
+		if self._docstring_sections is None:
+			self._docstring_sections = {}
+		if title not in self._docstring_sections:
+			self._docstring_sections[title] = self.scan_docstring_section(section_header_position)
+		return self._docstring_sections[title]
+
+	def scan_docstring_section(self, section_header_position: slice) -> tuple[slice, slice, slice]:
+		contents = self.file.contents
+		indent_size = get_indent_size_at(contents, section_header_position.start)
+		section_end = section_end_regex(indent_size).search(contents, section_header_position.stop, self.docstring_stop).start()
 		section_position = slice(section_header_position.stop, section_end)
-		section_footer_position = slice(*re.compile(r'\n*').match(self.file.contents, section_end).span())
+		section_footer_position = slice(*NEWLINES_REGEX.match(contents, section_end).span())
 		return (section_header_position, section_position, section_footer_position)
 
-	@functools.cached_property
+	@property
 	def doc_args(self) -> dict[str, DocArg]:
+		if self._doc_args is None:
+			self._doc_args = self.parse_doc_args()
+		return self._doc_args
+
+	def parse_doc_args(self) -> dict[str, DocArg]:
 		if not self.has_docstring:
 			return {}
 		parameters_section = self.find_docstring_section('Parameters')
@@ -78,20 +152,23 @@ class Func:
 		_, section_position, _ = parameters_section
 
 		param_indent = get_indent_size_at(self.file.contents, section_position.start)
-		param_regex = re.compile(rf'^ {{{param_indent}}}\**(\w+) ?:?(?: (.+))?$', flags=re.MULTILINE)
-		params = list(param_regex.finditer(self.file.contents, section_position.start, section_position.stop))
+		params = list(param_regex(param_indent).finditer(self.file.contents, section_position.start, section_position.stop))
 
 		doc_args = {}
-		param_section_end = re.compile('').match(self.file.contents, section_position.stop, section_position.stop)
-		for match, next_match in zip(params, params[1:] + [param_section_end]):
+		# each param ends where the next one starts
+		param_ends = [match.start() for match in params[1:]] + [section_position.stop]
+		for match, param_end in zip(params, param_ends):
 			name = match.group(1)
 			assert name not in doc_args, f'[{self}] duplicate arg {name} in docstring'
 			doc_args[name] = DocArg(
 				func=self,
 				type=match.group(2),
-				annotation_position=slice(match.end(1), match.end()),
-				name_position=slice(match.start(1), match.end(1)),
-				position=slice(match.start(), next_match.start()),
+				annotation_start=match.end(1),
+				annotation_stop=match.end(),
+				name_start=match.start(1),
+				name_stop=match.end(1),
+				start=match.start(),
+				stop=param_end,
 			)
 		return doc_args
 
@@ -107,12 +184,9 @@ class Func:
 		# if there are no more doc args, delete the section header as well
 		if not self.doc_args:
 			section_header_position, _, section_footer_position = self.find_docstring_section('Parameters')
-			self.file.register_modification(section_header_position, '')
-			self.file.register_modification(section_footer_position, '')
+			self.file.register_modifications([(section_header_position, ''), (section_footer_position, '')])
 
-	@functools.cached_property
-	def func_args(self) -> dict[str, FuncArg]:
-		args = self.func.args
+	def parse_func_args(self, args: ast.arguments) -> dict[str, FuncArg]:
 		args = [
 			*zip(args.posonlyargs + args.args, [None]*(len(args.posonlyargs + args.args) - len(args.defaults)) + args.defaults),
 			*([(args.vararg, None)] if args.vararg else []),
@@ -126,31 +200,53 @@ class Func:
 				func_args[arg.arg] = FuncArg(
 					func=self,
 					type=ast.unparse(arg.annotation),
-					annotation_position=slice(-1, -1), # NOTE: this is complicated to calculate but we never need it
-					default=default,
+					# NOTE: this is complicated to calculate but we never need it
+					annotation_start=-1,
+					annotation_stop=-1,
+					default=default and ast.unparse(default),
 				)
 			else:
-				assert arg.lineno == arg.end_lineno and arg.col_offset + len(arg.arg) == arg.end_col_offset
-				pos = self.file.line_offsets[arg.end_lineno - 1] + arg.end_col_offset
+				pos = self.file.line_index.offset(arg.end_lineno, arg.end_col_offset)
+				assert arg.lineno == arg.end_lineno and self.file.line_index.offset(arg.lineno, arg.col_offset) + len(arg.arg) == pos
 				func_args[arg.arg] = FuncArg(
 					func=self,
 					type=None,
-					annotation_position=slice(pos, pos),
-					default=default,
+					annotation_start=pos,
+					annotation_stop=pos,
+					default=default and ast.unparse(default),
 				)
 		return func_args
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class DocArg:
 	func: Func
 	type: typing.Optional[str]
-	annotation_position: slice
-	name_position: slice
-	position: slice
+	annotation_start: int
+	annotation_stop: int
+	name_start: int
+	name_stop: int
+	start: int
+	stop: int
+
+	@property
+	def annotation_position(self) -> slice:
+		return slice(self.annotation_start, self.annotation_stop)
+
+	@property
+	def name_position(self) -> slice:
+		return slice(self.name_start, self.name_stop)
+
+	@property
+	def position(self) -> slice:
+		return slice(self.start, self.stop)
+
+	# the modification deleting the type, for registering it with others
+	def annotation_deletion(self) -> tuple[slice, str]:
+		return self.annotation_position, ''
 
 	def delete_annotation(self) -> None:
-		self.func.file.register_modification(self.annotation_position, '')
+		self.func.file.register_modification(*self.annotation_deletion())
 
 	def rename_in_docstring(self, new_name) -> None:
 		self.func.file.register_modification(self.name_position, new_name)
@@ -159,12 +255,22 @@ class DocArg:
 		self.func.file.register_modification(self.position, '')
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class FuncArg:
 	func: Func
 	type: typing.Optional[str]
-	annotation_position: slice
-	default: typing.Optional[ast.AST]
+	annotation_start: int
+	annotation_stop: int
+	# the source code of the default value
+	default: typing.Optional[str]
+
+	@property
+	def annotation_position(self) -> slice:
+		return slice(self.annotation_start, self.annotation_stop)
+
+	# the modification adding the type annotation, for registering it with others
+	def annotation_addition(self, type: str) -> tuple[slice, str]:
+		return self.annotation_position, f': {type}'
 
 	def set_annotation(self, type: str) -> None:
-		self.func.file.register_modification(self.annotation_position, f': {type}')
+		self.func.file.register_modification(*self.annotation_addition(type))
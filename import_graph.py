@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import ast
+import dataclasses
+import typing
+
+if typing.TYPE_CHECKING:
+	from exports import ExportIndex
+
+
+# the name of the module in `sys.modules`, packages are named after their folder
+canonical_module_name = lambda module_name: module_name.removesuffix('.__init__')
+# `try` statements, `except*` only exists since python 3.11
+TRY_NODES = (ast.Try, ast.TryStar) if hasattr(ast, 'TryStar') else (ast.Try,)
+
+
+# the absolute name of the module of `from <dots><module> import ...` in `package`,
+# `None` for a relative import beyond the top-level package
+def resolve_import(package: list[str], level: int, module: typing.Optional[str]) -> typing.Optional[str]:
+	if not level:
+		return module
+	if level > len(package):
+		return None
+	return '.'.join(package[:len(package) - level + 1] + ([module] if module else []))
+
+
+# the modules which a module imports when it's executed, found from its top-level statements,
+# since `from a import b` may import the module `a.b` it lists both
+def find_imported_modules(tree: ast.Module, module_name: str) -> list[str]:
+	# the package that relative imports are relative to
+	package = module_name.split('.')[:-1]
+	modules = []
+
+	def visit(statements: list[ast.stmt]) -> None:
+		for node in statements:
+			if isinstance(node, ast.Import):
+				modules.extend(alias.name for alias in node.names)
+			elif isinstance(node, ast.ImportFrom):
+				module = resolve_import(package, node.level, node.module)
+				if module is None:
+					continue
+				modules.append(module)
+				modules.extend(f'{module}.{alias.name}' for alias in node.names if alias.name != '*')
+			elif isinstance(node, ast.If):
+				# imports guarded by `TYPE_CHECKING` never run
+				if ast.unparse(node.test) not in ('TYPE_CHECKING', 'typing.TYPE_CHECKING'):
+					visit(node.body)
+				visit(node.orelse)
+			elif isinstance(node, TRY_NODES):
+				visit(node.body)
+				for handler in node.handlers:
+					visit(handler.body)
+				visit(node.orelse)
+				visit(node.finalbody)
+			elif isinstance(node, ast.With):
+				visit(node.body)
+
+	visit(tree.body)
+	return list(dict.fromkeys(modules))
+
+
+# the modules of the project importing each other at runtime, as a graph of its strongly connected components
+# which is kept in topological order as imports are added, so an import which would create a cycle is found
+# without searching the whole graph again
+@dataclasses.dataclass
+class ImportGraph:
+	# the modules each module imports, by their canonical names
+	edges: dict[str, set[str]]
+	# the imports which were not added because they would create a cycle, as (importing module, imported module)
+	rejected_imports: list[tuple[str, str]] = dataclasses.field(init=False, default_factory=list)
+
+	def __post_init__(self) -> None:
+		components = self.find_components()
+		# the index of the component of each module
+		self.component = {module: i for i, component in enumerate(components) for module in component}
+		self.successors = [set() for _ in components]
+		self.predecessors = [set() for _ in components]
+		for module, imported_modules in self.edges.items():
+			for imported_module in imported_modules:
+				if self.component[module] != self.component[imported_module]:
+					self.successors[self.component[module]].add(self.component[imported_module])
+					self.predecessors[self.component[imported_module]].add(self.component[module])
+		# tarjan's algorithm finds a component after all the components it imports,
+		# so reversing it gives a topological order where every component comes before the ones it imports
+		self.position = [len(components) - 1 - i for i in range(len(components))]
+
+	@classmethod
+	def from_index(cls, export_index: ExportIndex) -> ImportGraph:
+		modules = {
+			canonical_module_name(file_exports.module_name): file_exports.imported_modules
+			for file_exports in export_index.files.values()
+			if file_exports.module_name
+		}
+		edges = {module: set() for module in modules}
+		for module, imported_modules in modules.items():
+			for imported_module in imported_modules:
+				edges[module].update(runtime_imports(edges, module, imported_module))
+		return cls(edges)
+
+	# the strongly connected components of the graph, with tarjan's algorithm (iteratively since the graph may be deep)
+	def find_components(self) -> list[list[str]]:
+		index = {}
+		lowlink = {}
+		stack = []
+		on_stack = set()
+		components = []
+		for root in sorted(self.edges):
+			if root in index:
+				continue
+			index[root] = lowlink[root] = len(index)
+			stack.append(root)
+			on_stack.add(root)
+			work = [(root, iter(sorted(self.edges[root])))]
+			while work:
+				module, imported_modules = work[-1]
+				for imported_module in imported_modules:
+					if imported_module not in index:
+						index[imported_module] = lowlink[imported_module] = len(index)
+						stack.append(imported_module)
+						on_stack.add(imported_module)
+						work.append((imported_module, iter(sorted(self.edges[imported_module]))))
+						break
+					if imported_module in on_stack:
+						lowlink[module] = min(lowlink[module], index[imported_module])
+				else:
+					work.pop()
+					if work:
+						lowlink[work[-1][0]] = min(lowlink[work[-1][0]], lowlink[module])
+					if lowlink[module] == index[module]:
+						component = []
+						while True:
+							member = stack.pop()
+							on_stack.remove(member)
+							component.append(member)
+							if member == module:
+								break
+						components.append(component)
+		return components
+
+	# add a top-level import to the graph unless it would create a cycle, returns whether it was added
+	def add_import(self, module_name: str, imported_module_name: str) -> bool:
+		module = canonical_module_name(module_name)
+		if module not in self.component:
+			# not a module of the project, so nothing imports it
+			return True
+		imported_modules = runtime_imports(self.component, module, canonical_module_name(imported_module_name))
+		# a cycle goes through exactly one new edge, so the imported modules can be checked separately
+		if any(self.creates_cycle(self.component[module], self.component[imported_module]) for imported_module in imported_modules):
+			if (module, canonical_module_name(imported_module_name)) not in self.rejected_imports:
+				self.rejected_imports.append((module, canonical_module_name(imported_module_name)))
+			return False
+		for imported_module in imported_modules:
+			self.edges[module].add(imported_module)
+			self.add_edge(self.component[module], self.component[imported_module])
+		return True
+
+	def creates_cycle(self, source: int, target: int) -> bool:
+		if source == target:
+			return True
+		# only the components before `source` in the order can reach it
+		return self.position[target] < self.position[source] and source in self.search(target, self.successors, upper=self.position[source])
+
+	# the components reachable from `component` along `edges` whose positions are between `lower` and `upper`
+	def search(self, component: int, edges: list[set[int]], lower: int = 0, upper: typing.Optional[int] = None) -> list[int]:
+		upper = len(self.position) if upper is None else upper
+		visited = {component}
+		stack = [component]
+		while stack:
+			for next_component in edges[stack.pop()]:
+				if next_component not in visited and lower <= self.position[next_component] <= upper:
+					visited.add(next_component)
+					stack.append(next_component)
+		return list(visited)
+
+	# add an edge which doesn't create a cycle and restore the topological order (pearce and kelly),
+	# only the components between the two ends in the order may need to move
+	def add_edge(self, source: int, target: int) -> None:
+		self.successors[source].add(target)
+		self.predecessors[target].add(source)
+		lower, upper = self.position[target], self.position[source]
+		if upper < lower:
+			# already in order
+			return
+		# move the components reaching `source` before the components reachable from `target`, reusing their positions
+		reachable_from_target = sorted(self.search(target, self.successors, upper=upper), key=self.position.__getitem__)
+		reaching_source = sorted(self.search(source, self.predecessors, lower=lower), key=self.position.__getitem__)
+		moved = reaching_source + reachable_from_target
+		for component, position in zip(moved, sorted(self.position[component] for component in moved)):
+			self.position[component] = position
+
+
+# the modules of the project which are executed by importing a module, which includes its parent packages,
+# except for the packages of the importing module since they were already imported before it
+def runtime_imports(modules: typing.Container[str], module: str, imported_module: str) -> list[str]:
+	parts = imported_module.split('.')
+	return [
+		package
+		for package in ('.'.join(parts[:i]) for i in range(1, len(parts) + 1))
+		if package in modules and package != module and not module.startswith(f'{package}.')
+	]
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import pathlib
+import subprocess
+import typing
+
+from exports import ExportIndex
+from file import load_files
+from watch import changed_names, scan_mtimes
+
+if typing.TYPE_CHECKING:
+	from cache import ParseCache
+	from discovery import SourceFinder
+	from file import File
+	from prescan import ScannedFile
+
+
+# the python files which were changed since the git ref, relative to the root, including deleted and untracked files,
+# only the ones which the finder would find if it's given
+def changed_file_names(root: pathlib.Path, ref: str, finder: typing.Optional[SourceFinder] = None) -> list[str]:
+	git = lambda *args: subprocess.run(['git', *args], cwd=root, check=True, capture_output=True, text=True).stdout.splitlines()
+	# a renamed file is listed with both of its names
+	names = git('diff', '--name-only', '--no-renames', '--relative', ref, '--') + git('ls-files', '--others', '--exclude-standard')
+	if finder is not None:
+		return sorted({name for name in names if finder.includes(name)})
+	return sorted({name for name in names if name.endswith('.py')})
+
+
+# find the files changed since the git ref and the files that may need to import their exports,
+# returns them with the export index saved by a previous run, updated with them and with the current modification times
+def find_changed_files(
+	root: pathlib.Path,
+	ref: str,
+	cache: ParseCache,
+	finder: SourceFinder,
+	jobs: int = 1,
+	prescan: bool = False,
+) -> tuple[list[pathlib.Path], ExportIndex]:
+	export_index_path = cache.export_index_path(root)
+	assert export_index_path.is_file(), f'No saved export index for {root}, run once without --since first'
+	saved_export_index = ExportIndex.load(export_index_path)
+	# the files which changed since the index was saved are loaded again too, even if they didn't change since the ref
+	mtimes = scan_mtimes(finder)
+	names = set(changed_file_names(root, ref, finder)) | changed_names(saved_export_index.mtimes, mtimes)
+	files, export_index = load_changed_files(root, sorted(names), saved_export_index, cache, jobs, prescan)
+	export_index.mtimes = mtimes
+	# the files are in the cache now, so loading them again is cheap
+	return [file.path for file in files], export_index
+
+
+# load the changed files which still exist and the files that may need to import their exports,
+# returns them with the export index updated with them
+def load_changed_files(
+	root: pathlib.Path,
+	changed_names: list[str],
+	export_index: ExportIndex,
+	cache: typing.Optional[ParseCache] = None,
+	jobs: int = 1,
+	prescan: bool = False,
+) -> tuple[list[File | ScannedFile], ExportIndex]:
+	deleted_names = [name for name in changed_names if not (root / name).is_file()]
+	files = load_files([root / name for name in changed_names if name not in deleted_names], root, jobs, cache, prescan)
+
+	# the exports of the changed files, both before and after the change
+	changed_exports = {export for file in files for export in file.exports}
+	changed_exports |= {export for name in changed_names if name in export_index.files for export in export_index.files[name].exports}
+	referencing_names = [name for name in export_index.referencing_files(changed_exports) if name not in changed_names]
+	files += load_files([root / name for name in referencing_names if (root / name).is_file()], root, jobs, cache, prescan)
+
+	return files, export_index.updated(files, deleted_names)
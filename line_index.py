@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import array
+import dataclasses
+import itertools
+
+
+# maps the (line, column) positions of the ast to offsets in the text,
+# the ast counts columns in utf8 bytes, which are only the same as characters on lines which are all ascii
+@dataclasses.dataclass
+class LineIndex:
+	text: str = dataclasses.field(repr=False)
+	# the offset of the start of each line, by zero-based line number
+	line_starts: array.array = dataclasses.field(init=False)
+	# the zero-based numbers of the lines with non-ascii characters
+	non_ascii_lines: frozenset[int] = dataclasses.field(init=False)
+
+	def __post_init__(self) -> None:
+		lines = self.text.split('\n')
+		# each line starts after the previous one and its newline
+		self.line_starts = array.array('q', itertools.accumulate(map((1).__add__, map(len, lines[:-1])), initial=0))
+		if self.text.isascii():
+			self.non_ascii_lines = frozenset()
+		else:
+			self.non_ascii_lines = frozenset(i for i, line in enumerate(lines) if not line.isascii())
+
+	# the offset of the start of the line, `lineno` is one-based like in the ast
+	def line_start(self, lineno: int) -> int:
+		return self.line_starts[lineno - 1]
+
+	# the offset of a position of the ast, `col_offset` is in utf8 bytes from the start of the line
+	def offset(self, lineno: int, col_offset: int) -> int:
+		line_start = self.line_starts[lineno - 1]
+		if lineno - 1 not in self.non_ascii_lines:
+			return line_start + col_offset
+		line_end = self.text.find('\n', line_start)
+		line = self.text[line_start:line_end if line_end != -1 else len(self.text)]
+		return line_start + len(line.encode('utf8')[:col_offset].decode('utf8'))
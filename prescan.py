@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import dataclasses
+import pathlib
+import re
+import typing
+
+from import_graph import resolve_import
+
+if typing.TYPE_CHECKING:
+	from file import File
+
+
+# the header of a parameters section in a docstring, like `SECTION_HEADER_REGEX` in func.py
+PARAMETERS_HEADER_REGEX = re.compile(r'^ *Parameters *\n *-+\n', flags=re.MULTILINE)
+# what the scan needs to see in a file, everything else is skipped by `search`, the lookahead makes it skip quickly,
+# the strings and comments are matched as a whole so nothing inside them is mistaken for code,
+# the prefixes of the strings are skipped since they don't change where the strings end
+TOKEN_REGEX = re.compile(r'''(?=["'\#\\()\[\]{}\n:;])(?:
+	(?P<string>
+		"""[^"\\]*(?:(?:\\.|"(?!""))[^"\\]*)*"""
+		| \'\'\'[^'\\]*(?:(?:\\.|'(?!''))[^'\\]*)*\'\'\'
+		| "[^"\\\n]*(?:\\.[^"\\\n]*)*"
+		| '[^'\\\n]*(?:\\.[^'\\\n]*)*'
+	)
+	| (?P<comment>\#[^\n]*)
+	# the newline is part of the line, so the line after it doesn't start a statement
+	| (?P<continuation>\\\n)
+	| (?P<open>[(\[{])
+	| (?P<close>[)\]}])
+	# the first keyword of a statement at the start of a line, with the newline before it
+	| \n(?P<indent>[ \t]*)(?P<keyword>class|def|async|if|elif|else|try|except|finally|with|for|while|match|case|import|from)\b
+	# classes and imports which don't start a line, like in `if a: import b`
+	| [:;][ \t]*(?P<inline_keyword>class|import)\b
+)''', flags=re.DOTALL | re.VERBOSE)
+CLASS_NAME_REGEX = re.compile(r'[ \t]+(\w+)')
+TYPE_CHECKING_REGEX = re.compile(r'[ \t(]*(?:typing[ \t]*\.[ \t]*)?TYPE_CHECKING[ \t)]*:')
+# the rest of `import a.b as c, d` after the keyword, the lines may be continued with backslashes
+IMPORT_NAMES_REGEX = re.compile(r'(?:[ \t]|\\\n)+((?:[\w. \t,]|\\\n)+?)[ \t]*(?=\n|#|\Z)')
+# the rest of `from ..a import (b as c, d)` after the keyword, the names may be in parentheses over several lines
+IMPORT_FROM_REGEX = re.compile(r'(?:[ \t]|\\\n)+(\.*)(?:[ \t]|\\\n)*([\w.]*)(?:[ \t]|\\\n)+import(?:[ \t]|\\\n)+(?:\(([^()]*)\)|((?:[\w \t,*]|\\\n)+?))[ \t]*(?=\n|#|\Z)')
+# the blocks of a compound statement whose imports run with the top-level code, see `find_imported_modules`
+TOP_LEVEL_BLOCKS = {'if', 'try', 'except', 'finally', 'with'}
+
+
+# what a lexical scan finds in a file, without parsing it
+@dataclasses.dataclass
+class SourceScan:
+	# the names of all the classes defined in the file
+	exports: set[str]
+	# the modules imported by the top-level code of the file, like `find_imported_modules`
+	imported_modules: list[str]
+	# whether a docstring may have a parameters section, so there may be something to fix in the file
+	has_parameters: bool
+
+
+# the nesting of the blocks at a point of the file
+class Block(typing.NamedTuple):
+	indent: int
+	keyword: str
+	# whether the imports in the block run with the top-level code
+	top_level: bool
+
+
+# finds what the export index needs from the contents of a file with regexes, and whether it needs to be parsed to be fixed,
+# returns `None` for code the scan can't follow, which needs to be parsed
+def scan_source(contents: str, module_name: typing.Optional[str]) -> typing.Optional[SourceScan]:
+	has_parameters = '"""' in contents and PARAMETERS_HEADER_REGEX.search(contents) is not None
+	package = module_name.split('.')[:-1] if module_name is not None else []
+	exports = set()
+	modules = []
+	blocks: list[Block] = []
+	depth = 0
+
+	# every line starts after a newline, including the first one
+	contents = '\n' + contents
+	pos = 0
+	while match := TOKEN_REGEX.search(contents, pos):
+		pos = match.end()
+		kind = match.lastgroup
+		if kind == 'open':
+			depth += 1
+		elif kind == 'close':
+			depth -= 1
+		elif kind == 'inline_keyword':
+			if match['inline_keyword'] == 'import' or (class_name := CLASS_NAME_REGEX.match(contents, pos)) is None:
+				return None
+			exports.add(class_name[1])
+		elif kind == 'keyword' and depth == 0:
+			keyword = match['keyword']
+			indent = len(match['indent'])
+			# the blocks which end before the statement
+			previous_block = None
+			while blocks and blocks[-1].indent >= indent:
+				previous_block = blocks.pop()
+			if previous_block is not None and previous_block.indent != indent:
+				previous_block = None
+
+			if keyword == 'class':
+				if (class_name := CLASS_NAME_REGEX.match(contents, pos)) is None:
+					return None
+				exports.add(class_name[1])
+			if keyword in ('import', 'from'):
+				statement = (IMPORT_NAMES_REGEX if keyword == 'import' else IMPORT_FROM_REGEX).match(contents, pos)
+				if statement is None:
+					return None
+				# the names in parentheses are skipped with the statement
+				pos = statement.end()
+				if module_name is None or not all(block.top_level for block in blocks):
+					continue
+				if keyword == 'import':
+					modules.extend(name.split()[0] for name in statement[1].replace('\\\n', ' ').split(','))
+					continue
+				module = resolve_import(package, len(statement[1]), statement[2] or None)
+				if module is None:
+					continue
+				names = statement[3] if statement[3] is not None else statement[4]
+				names = [name.split()[0] for name in re.sub(r'#[^\n]*|\\\n', ' ', names).split(',') if name.strip()]
+				modules.append(module)
+				modules.extend(f'{module}.{name}' for name in names if name != '*')
+			elif keyword == 'if' or keyword == 'elif':
+				# the imports guarded by `TYPE_CHECKING` never run
+				blocks.append(Block(indent, 'if', TYPE_CHECKING_REGEX.match(contents, pos) is None))
+			elif keyword == 'else' or keyword == 'except' or keyword == 'finally':
+				if previous_block is None:
+					return None
+				# the `else` of a loop doesn't run with the top-level code
+				blocks.append(Block(indent, previous_block.keyword, previous_block.keyword in TOP_LEVEL_BLOCKS))
+			elif keyword != 'import' and keyword != 'from':
+				# `async with` is not a top-level block, unlike `with`
+				blocks.append(Block(indent, keyword, keyword in TOP_LEVEL_BLOCKS))
+	if depth != 0:
+		return None
+	return SourceScan(exports, list(dict.fromkeys(modules)), has_parameters)
+
+
+# a file which the scan found nothing to fix in, with only what the export index needs from it
+@dataclasses.dataclass
+class ScannedFile:
+	path: pathlib.Path
+	relative_path: pathlib.Path
+	name: str
+	module_name: typing.Optional[str]
+	exports: set[str]
+	imported_modules: list[str]
+	# like `File.functions`, there are no functions with parameters in their docstrings
+	functions: list = dataclasses.field(default_factory=list)
+
+	# `None` if the file needs to be parsed, because it may have something to fix or the scan couldn't follow it
+	@classmethod
+	def from_file(cls, file: File) -> typing.Optional[ScannedFile]:
+		scan = scan_source(file.contents, file.module_name)
+		if scan is None or scan.has_parameters:
+			return None
+		return cls(file.path, file.relative_path, file.name, file.module_name, scan.exports, scan.imported_modules)
+
+
+# the differences between the scan of a parsed file and what was found by parsing it, for verifying the scan
+def verify_scan(file: File) -> list[str]:
+	scan = scan_source(file.contents, file.module_name)
+	if scan is None:
+		return []
+	differences = []
+	if scan.exports != file.exports:
+		differences.append(f'classes {sorted(scan.exports)} instead of {sorted(file.exports)}')
+	if scan.imported_modules != file.imported_modules:
+		differences.append(f'imported modules {scan.imported_modules} instead of {file.imported_modules}')
+	if not scan.has_parameters and any(func.doc_args for func in file.functions):
+		differences.append('no parameters in docstrings')
+	return differences
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import json
+import pathlib
+import sys
+import time
+import tracemalloc
+import typing
+
+try:
+	import resource
+except ImportError:
+	# not available on windows
+	resource = None
+
+T = typing.TypeVar('T')
+
+
+# the peak resident memory of the process so far, in bytes
+def get_peak_rss() -> typing.Optional[int]:
+	if resource is None:
+		return None
+	peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# kilobytes on linux, bytes on macos
+	return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+@dataclasses.dataclass
+class Measurement:
+	wall_time: float = 0
+	cpu_time: float = 0
+	# the peak memory allocated by python during the measurement, in bytes
+	peak_traced_memory: int = 0
+	# the peak resident memory of the process at the end of the measurement, in bytes
+	peak_rss: typing.Optional[int] = None
+
+
+# measures the time and memory of the phases of a run, does nothing if not enabled
+@dataclasses.dataclass
+class Profiler:
+	enabled: bool = True
+	top_files: int = 20
+	sections: dict[str, dict[str, Measurement]] = dataclasses.field(init=False, default_factory=dict)
+	# the wall time spent on each file
+	file_times: dict[str, float] = dataclasses.field(init=False, default_factory=dict)
+	# the peak traced memory of the measurements which are in progress, to propagate the peaks of nested ones
+	_peaks: list[int] = dataclasses.field(init=False, default_factory=list)
+
+	def __post_init__(self) -> None:
+		if self.enabled:
+			tracemalloc.start()
+
+	@contextlib.contextmanager
+	def measure(self, section: str, name: str) -> typing.Iterator[None]:
+		if not self.enabled:
+			yield
+			return
+
+		# the peak of the enclosing measurement is reset, so remember it
+		if self._peaks:
+			self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+		tracemalloc.reset_peak()
+		self._peaks.append(0)
+		start_wall_time = time.perf_counter()
+		start_cpu_time = time.process_time()
+		try:
+			yield
+		finally:
+			measurement = self.sections.setdefault(section, {}).setdefault(name, Measurement())
+			measurement.wall_time += time.perf_counter() - start_wall_time
+			measurement.cpu_time += time.process_time() - start_cpu_time
+			peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+			measurement.peak_traced_memory = max(measurement.peak_traced_memory, peak)
+			measurement.peak_rss = get_peak_rss()
+			if self._peaks:
+				self._peaks[-1] = max(self._peaks[-1], peak)
+
+	# yields the items of the iterable, measuring the time taken to produce each of them
+	def measure_iter(self, section: str, name: str, iterable: typing.Iterable[T]) -> typing.Iterator[T]:
+		iterator = iter(iterable)
+		while True:
+			with self.measure(section, name):
+				try:
+					item = next(iterator)
+				except StopIteration:
+					return
+			yield item
+
+	@contextlib.contextmanager
+	def measure_file(self, name: str) -> typing.Iterator[None]:
+		if not self.enabled:
+			yield
+			return
+
+		start_wall_time = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.file_times[name] = self.file_times.get(name, 0) + time.perf_counter() - start_wall_time
+
+	def report(self) -> dict:
+		slowest_files = sorted(self.file_times.items(), key=lambda item: item[1], reverse=True)[:self.top_files]
+		return {
+			**{
+				section: {name: dataclasses.asdict(measurement) for name, measurement in measurements.items()}
+				for section, measurements in self.sections.items()
+			},
+			'slowest_files': [{'file': name, 'wall_time': wall_time} for name, wall_time in slowest_files],
+		}
+
+	def save(self, path: pathlib.Path, **extra) -> None:
+		path.write_text(json.dumps(extra | self.report(), indent='\t'), 'utf8')
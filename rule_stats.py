@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import pathlib
+import typing
+
+
+@dataclasses.dataclass
+class RuleStats:
+	calls: int = 0
+	# the calls where the rule changed the type, or where the special case applied
+	hits: int = 0
+	# the time spent applying the rule, in seconds
+	time: float = 0
+
+
+# counts how often each type cleanup and special case is used during a run, and how long the cleanups take,
+# to find the rules which are never used and the expensive ones
+@dataclasses.dataclass
+class RuleCounters:
+	# by section, like 'type_cleanups', and by the name of the rule in the section
+	sections: dict[str, dict[str, RuleStats]] = dataclasses.field(default_factory=dict)
+
+	# register the rules of a section, so the ones which are never used are reported
+	def add_rules(self, section: str, names: typing.Iterable[str]) -> None:
+		rules = self.sections.setdefault(section, {})
+		for name in names:
+			rules.setdefault(name, RuleStats())
+
+	def record(self, section: str, name: str, hit: bool, time: float = 0) -> None:
+		stats = self.sections.setdefault(section, {}).setdefault(name, RuleStats())
+		stats.calls += 1
+		stats.hits += hit
+		stats.time += time
+
+	# the rules with no hits, by section
+	def unused_rules(self) -> dict[str, list[str]]:
+		return {section: [name for name, stats in rules.items() if not stats.hits] for section, rules in self.sections.items()}
+
+	# the rules of each section from the most to the least expensive, then from the most to the least used
+	def report(self) -> dict:
+		return {
+			section: {
+				'rules': [
+					{'rule': name, **dataclasses.asdict(stats)}
+					for name, stats in sorted(rules.items(), key=lambda item: (item[1].time, item[1].hits), reverse=True)
+				],
+				'unused': unused,
+			}
+			for (section, rules), unused in zip(self.sections.items(), self.unused_rules().values())
+		}
+
+	def save(self, path: pathlib.Path, **extra) -> None:
+		path.write_text(json.dumps(extra | self.report(), indent='\t'), 'utf8')
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import dataclasses
+import importlib
+import json
+import pathlib
+import types
+import typing
+
+try:
+	import tomllib
+except ImportError:
+	# only in python 3.11+
+	tomllib = None
+
+import special_cases
+
+if typing.TYPE_CHECKING:
+	from rule_stats import RuleCounters
+
+
+# the tables of special cases, which are the keys of the files of special cases
+TABLES = ('name_replacements', 'matching_types', 'converted_types')
+
+
+# the special cases indexed by (file, function), so checking an arg doesn't scan all of them
+@dataclasses.dataclass
+class SpecialCases:
+	# the new names of args in the docstring, an empty name means the arg should be deleted
+	name_replacements: dict[tuple[str, str], dict[str, str]] = dataclasses.field(default_factory=dict)
+	# (arg, cleaned annotation, cleaned docstring type) which are known to match although they're different
+	matching_types: dict[tuple[str, str], frozenset[tuple[str, str, str]]] = dataclasses.field(default_factory=dict)
+	# the annotations to use for (arg, cleaned docstring type)
+	converted_types: dict[tuple[str, str], dict[tuple[str, str], str]] = dataclasses.field(default_factory=dict)
+	# counts the special cases which apply if set, see `count_rules`
+	rule_counters: typing.Optional[RuleCounters] = dataclasses.field(default=None, repr=False, compare=False)
+
+	@classmethod
+	def from_tuples(
+		cls,
+		name_replacements: dict[tuple[str, str, str], str],
+		matching_types: typing.Iterable[tuple[str, str, str, str, str]],
+		converted_types: dict[tuple[str, str, str, str], str],
+	) -> SpecialCases:
+		special_cases = cls()
+		for (file, func, arg), new_name in name_replacements.items():
+			special_cases.name_replacements.setdefault((file, func), {})[arg] = new_name
+		for file, func, arg, annotation, docstring_type in matching_types:
+			special_cases.matching_types.setdefault((file, func), set()).add((arg, annotation, docstring_type))
+		special_cases.matching_types = {key: frozenset(cases) for key, cases in special_cases.matching_types.items()}
+		for (file, func, arg, docstring_type), annotation in converted_types.items():
+			special_cases.converted_types.setdefault((file, func), {})[arg, docstring_type] = annotation
+		return special_cases
+
+	# reads the special cases of a project from a TOML or JSON file with the tables
+	# `name_replacements` (file, func, arg, new_name), `matching_types` (file, func, arg, annotation, docstring_type)
+	# and `converted_types` (file, func, arg, docstring_type, annotation), each a list of tables with these keys
+	@classmethod
+	def load(cls, path: pathlib.Path) -> SpecialCases:
+		if path.suffix == '.toml':
+			assert tomllib is not None, 'Reading TOML needs python 3.11+'
+			tables = tomllib.loads(path.read_text('utf8'))
+		else:
+			tables = json.loads(path.read_text('utf8'))
+		unknown_tables = tables.keys() - set(TABLES)
+		assert not unknown_tables, f'Unknown tables in {path}: {", ".join(sorted(unknown_tables))}'
+		return cls.from_tuples(
+			{(case['file'], case['func'], case['arg']): case['new_name'] for case in tables.get('name_replacements', [])},
+			[(case['file'], case['func'], case['arg'], case['annotation'], case['docstring_type']) for case in tables.get('matching_types', [])],
+			{(case['file'], case['func'], case['arg'], case['docstring_type']): case['annotation'] for case in tables.get('converted_types', [])},
+		)
+
+	@classmethod
+	def from_module(cls, module: types.ModuleType) -> SpecialCases:
+		return cls.from_tuples(module.NAME_REPLACEMENTS, module.SPECIAL_CASES_FOR_COMPARING_TYPES, module.SPECIAL_CASES_FOR_CONVERTING_TYPES)
+
+	# the special cases of both, the other's win when both have a case for the same arg
+	def merged(self, other: SpecialCases) -> SpecialCases:
+		merged = SpecialCases()
+		for key in self.name_replacements.keys() | other.name_replacements.keys():
+			merged.name_replacements[key] = self.name_replacements.get(key, {}) | other.name_replacements.get(key, {})
+		for key in self.matching_types.keys() | other.matching_types.keys():
+			merged.matching_types[key] = self.matching_types.get(key, frozenset()) | other.matching_types.get(key, frozenset())
+		for key in self.converted_types.keys() | other.converted_types.keys():
+			merged.converted_types[key] = self.converted_types.get(key, {}) | other.converted_types.get(key, {})
+		return merged
+
+	# the (file, function) pairs whose special cases are different in the other
+	def changed_functions(self, other: SpecialCases) -> set[tuple[str, str]]:
+		changed = set()
+		for table in TABLES:
+			tables, other_tables = getattr(self, table), getattr(other, table)
+			changed |= {key for key in tables.keys() | other_tables.keys() if tables.get(key) != other_tables.get(key)}
+		return changed
+
+	# the special cases by table, as the tuples of `special_cases.py`
+	def entries(self) -> dict[str, list[tuple[str, ...]]]:
+		return {
+			'name_replacements': [(file, func, arg) for (file, func), args in self.name_replacements.items() for arg in args],
+			'matching_types': [(file, func, *case) for (file, func), cases in self.matching_types.items() for case in sorted(cases)],
+			'converted_types': [(file, func, *case) for (file, func), cases in self.converted_types.items() for case in cases],
+		}
+
+	# count the special cases which apply in `rule_counters`, or stop counting if `None`
+	def count_rules(self, rule_counters: typing.Optional[RuleCounters]) -> None:
+		self.rule_counters = rule_counters
+		if rule_counters is not None:
+			for table, entries in self.entries().items():
+				rule_counters.add_rules(table, map(repr, entries))
+
+	def name_replacement(self, file: str, func: str, arg: str) -> typing.Optional[str]:
+		new_name = self.name_replacements.get((file, func), {}).get(arg)
+		if new_name is not None and self.rule_counters is not None:
+			self.rule_counters.record('name_replacements', repr((file, func, arg)), True)
+		return new_name
+
+	def types_match(self, file: str, func: str, arg: str, annotation: str, docstring_type: str) -> bool:
+		match = (arg, annotation, docstring_type) in self.matching_types.get((file, func), frozenset())
+		if match and self.rule_counters is not None:
+			self.rule_counters.record('matching_types', repr((file, func, arg, annotation, docstring_type)), True)
+		return match
+
+	def converted_type(self, file: str, func: str, arg: str, docstring_type: str) -> str:
+		annotation = self.converted_types.get((file, func), {}).get((arg, docstring_type))
+		if annotation is None:
+			return docstring_type
+		if self.rule_counters is not None:
+			self.rule_counters.record('converted_types', repr((file, func, arg, docstring_type)), True)
+		return annotation
+
+
+SPECIAL_CASES_PATH = pathlib.Path(special_cases.__file__)
+# the special cases of manim, from `special_cases.py`
+MANIM_SPECIAL_CASES = SpecialCases.from_module(special_cases)
+
+
+# the special cases of manim with the ones in the given files, `special_cases.py` is read again if `reload`
+def load_special_cases(paths: typing.Iterable[pathlib.Path], reload: bool = False) -> SpecialCases:
+	loaded_special_cases = SpecialCases.from_module(importlib.reload(special_cases) if reload else special_cases)
+	for path in paths:
+		loaded_special_cases = loaded_special_cases.merged(SpecialCases.load(path))
+	return loaded_special_cases
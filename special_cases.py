@@ -87,11 +87,3 @@ SPECIAL_CASES_FOR_CONVERTING_TYPES = {
 	# was changed to support opengl but the docstring wasn't updated
 	('manim/scene/scene_file_writer.py', 'write_frame', 'frame_or_renderer', 'np.ndarray'): 'np.ndarray | OpenGLRenderer',
 }
-
-# imports that if added will cause a cycle, so we will guard them with `if TYPE_CHECKING`
-# these were found by running the tests and getting circular-import errors
-CIRCULAR_IMPORTS = [
-	('manim/utils/hashing.py', 'Scene'),
-	('manim/scene/scene_file_writer.py', 'OpenGLRenderer'),
-	('manim/renderer/cairo_renderer.py', 'Scene'),
-]
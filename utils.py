@@ -1,38 +1,155 @@
+from __future__ import annotations
+
 import functools
+import inspect
 import re
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+	from edits import Edit
+	from rule_stats import RuleCounters
 
 get_indent_size_at = lambda s, start: len(re.compile(r' *').match(s, start).group())
 remove_suffix = lambda text, suffix: text[:-len(suffix)] if text.endswith(suffix) else text
 zip_dicts = lambda d1, d2: {k: (v1, v2) for k, v1 in d1.items() if (v2 := d2.get(k)) is not None}
-# returns a list mapping from zero-based line number to zero-based offset in the string
-index_lines = lambda text: [match.start() for match in re.finditer(r'^', text, flags=re.MULTILINE)]
+# like `str.splitlines(keepends=True)` but only splits on '\n'
+split_lines = lambda text: re.findall(r'[^\n]*\n|[^\n]+$', text)
+
+
+# applies sorted non-overlapping `contents[start:stop] = replacement` modifications in a single pass
+def apply_modifications(contents: str, modifications: typing.Iterable[Edit]) -> str:
+	parts = []
+	end = 0
+	for modification in modifications:
+		parts += (contents[end:modification.start], modification.replacement)
+		end = modification.stop
+	parts.append(contents[end:])
+	return ''.join(parts)
+
+
+# a method of `list` which also counts the change in `version`
+def _counting_changes(method: typing.Callable) -> typing.Callable:
+	def changing_method(self: VersionedList, *args, **kwargs):
+		self.version += 1
+		return method(self, *args, **kwargs)
+	return changing_method
+
+
+# a list which counts its changes, so a change is noticed without comparing the whole list
+class VersionedList(list):
+	version = 0
+
+	__setitem__ = _counting_changes(list.__setitem__)
+	__delitem__ = _counting_changes(list.__delitem__)
+	__iadd__ = _counting_changes(list.__iadd__)
+	__imul__ = _counting_changes(list.__imul__)
+	append = _counting_changes(list.append)
+	extend = _counting_changes(list.extend)
+	insert = _counting_changes(list.insert)
+	pop = _counting_changes(list.pop)
+	remove = _counting_changes(list.remove)
+	clear = _counting_changes(list.clear)
+	sort = _counting_changes(list.sort)
+	reverse = _counting_changes(list.reverse)
+
+
+# a cleanup that replaces a precompiled regex
+sub = lambda pattern, replacement: lambda s, regex=re.compile(pattern): regex.sub(replacement, s)
 
 # applied one after the other, in order
-TYPE_CLEANUPS = [
+TYPE_CLEANUPS = VersionedList([
 	# we add ' | None' later if necessary
 	lambda s: remove_suffix(s, ', optional'),
 	lambda s: remove_suffix(s, ' | None'),
-	lambda s: re.sub(r'^Optional\[(.+)\]$', r'\1', s),
-	lambda s: re.sub(r'^\(([^)]+)\)$', r'\1', s), # removes surrounding parens
-	lambda s: re.sub(r"^'([^)]+)'$", r'\1', s), # removes surrounding quotes
-	lambda s: re.sub(r':?\bclass ?:`~?\.?([^`]+)`', r'\1', s), # replace :class: syntax with the name inside
+	sub(r'^Optional\[(.+)\]$', r'\1'),
+	sub(r'^\(([^)]+)\)$', r'\1'), # removes surrounding parens
+	sub(r"^'([^)]+)'$", r'\1'), # removes surrounding quotes
+	sub(r':?\bclass ?:`~?\.?([^`]+)`', r'\1'), # replace :class: syntax with the name inside
 	# normalize some stuff
 	lambda s: s.replace('numpy', 'np').replace('np.array', 'np.ndarray'),
-	lambda s: re.sub(r'\btyping\.', '', s), # prefer unqualified names from `typing`
-	lambda s: re.sub(r'\b(List|Dict|Tuple|Type)\b', lambda m: m.group().lower(), s),
-	lambda s: re.sub(r'\bstring\b', 'str', s),
-	lambda s: re.sub(r'\bBoolean\b', 'bool', s),
+	sub(r'\btyping\.', ''), # prefer unqualified names from `typing`
+	sub(r'\b(List|Dict|Tuple|Type)\b', lambda m: m.group().lower()),
+	sub(r'\bstring\b', 'str'),
+	sub(r'\bBoolean\b', 'bool'),
 	# wrong usages of Callable
 	lambda s: s.replace('Callable[[...]', 'Callable[...'),
-	lambda s: re.sub(r'Callable\[(\w+),', lambda m: f'Callable[[{m.group(1)}],', s),
+	sub(r'Callable\[(\w+),', lambda m: f'Callable[[{m.group(1)}],'),
 	# wrong usages of List
-	lambda s: re.sub(r'\b(list\[\w+), \.\.\.\]', r'\1]', s),
+	sub(r'\b(list\[\w+), \.\.\.\]', r'\1]'),
 	# replace all ways of specifying unions with pipe operators
 	lambda s: s.replace(' or ', ', '),
-	lambda s: re.sub(r' ?\| ?', ' | ', s),
-	lambda s: re.sub(r'^([\w., ]+)$', lambda m: ' | '.join(map(str.strip, m.group(1).split(','))), s),
-	lambda s: re.sub(r'\bUnion\[([\w., ]+)\]', lambda m: ' | '.join(map(str.strip, m.group(1).split(','))), s),
+	sub(r' ?\| ?', ' | '),
+	sub(r'^([\w., ]+)$', lambda m: ' | '.join(map(str.strip, m.group(1).split(',')))),
+	sub(r'\bUnion\[([\w., ]+)\]', lambda m: ' | '.join(map(str.strip, m.group(1).split(',')))),
 	lambda s: s.replace('float | int', 'float').replace('int | float', 'float'), # according to manim's "add typings" guidelines
-]
+])
+
+
+# a name for a cleanup in reports, the pattern of the ones made by `sub` and the source of the others
+def describe_cleanup(index: int, cleanup: typing.Callable[[str], str]) -> str:
+	if cleanup.__defaults__ and isinstance(cleanup.__defaults__[0], re.Pattern):
+		return f'{index}: sub({cleanup.__defaults__[0].pattern!r})'
+	try:
+		return f'{index}: {inspect.getsource(cleanup).strip()}'
+	except (OSError, TypeError):
+		return f'{index}: {cleanup!r}'
+
+
+# applies a list of cleanups to types, memoized since the same types repeat a lot
+class TypeCleaner:
+	def __init__(self, cleanups: list[typing.Callable[[str], str]], maxsize: int = 4096) -> None:
+		self.cleanups = cleanups
+		# the copy of the cleanups which the memoized results were computed with, and the version it was copied at
+		self._applied_cleanups = list(self.cleanups)
+		self._applied_version = self.cleanups.version
+		self._memo = functools.lru_cache(maxsize)(self._cleanup)
+		# counts the hits and the time of each cleanup if set, see `count_rules`
+		self.rule_counters: typing.Optional[RuleCounters] = None
+		self._cleanup_names: list[str] = []
+
+	# kept in a `VersionedList`, so checking that it didn't change is cheap enough for every call
+	@property
+	def cleanups(self) -> VersionedList:
+		return self._cleanups
+
+	@cleanups.setter
+	def cleanups(self, cleanups: list[typing.Callable[[str], str]]) -> None:
+		self._cleanups = cleanups if isinstance(cleanups, VersionedList) else VersionedList(cleanups)
+		# another list, whatever its version
+		self._applied_version = None
+
+	def __call__(self, s: str) -> str:
+		# the list of cleanups was replaced or changed, so the memoized results are stale
+		if self._applied_version != self._cleanups.version:
+			self.count_rules(self.rule_counters)
+		return self._memo(s)
+
+	def _cleanup(self, s: str) -> str:
+		if self.rule_counters is None:
+			return functools.reduce(lambda t, c: c(t), self._applied_cleanups, s)
+		for name, cleanup in zip(self._cleanup_names, self._applied_cleanups):
+			start = time.perf_counter()
+			cleaned = cleanup(s)
+			self.rule_counters.record('type_cleanups', name, cleaned != s, time.perf_counter() - start)
+			s = cleaned
+		return s
+
+	# count the use of each cleanup in `rule_counters`, or stop counting if `None`,
+	# the cleanups are only applied once to each type while it's memoized, so they're counted once per type
+	def count_rules(self, rule_counters: typing.Optional[RuleCounters]) -> None:
+		self.rule_counters = rule_counters
+		self._applied_cleanups = list(self.cleanups)
+		self._applied_version = self.cleanups.version
+		if rule_counters is not None:
+			self._cleanup_names = [describe_cleanup(i, cleanup) for i, cleanup in enumerate(self._applied_cleanups)]
+			rule_counters.add_rules('type_cleanups', self._cleanup_names)
+		# the memoized types were not counted
+		self._memo.cache_clear()
+
+	# the hits and misses of the memo
+	def cache_info(self) -> functools._CacheInfo:
+		return self._memo.cache_info()
+
 
-cleanup_type = lambda s: functools.reduce(lambda t, c: c(t), TYPE_CLEANUPS, s)
+cleanup_type = TypeCleaner(TYPE_CLEANUPS)
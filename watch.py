@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import pathlib
+import typing
+
+if typing.TYPE_CHECKING:
+	from discovery import SourceFinder
+
+
+# the modification times of the files to fix, by their names relative to the root
+def scan_mtimes(finder: SourceFinder) -> dict[str, int]:
+	mtimes = {}
+	for _ in record_mtimes(finder.find(), finder.root, mtimes):
+		pass
+	return mtimes
+
+
+# yields the paths, adding their modification times to `mtimes` by their names relative to the root as they're found
+def record_mtimes(paths: typing.Iterable[pathlib.Path], root: pathlib.Path, mtimes: dict[str, int]) -> typing.Iterator[pathlib.Path]:
+	for path in paths:
+		try:
+			mtimes[path.relative_to(root).as_posix()] = path.stat().st_mtime_ns
+		except FileNotFoundError:
+			# deleted while scanning
+			pass
+		yield path
+
+
+# the modification times of the given files, `None` for the ones which don't exist
+def file_mtimes(paths: typing.Iterable[pathlib.Path]) -> dict[pathlib.Path, typing.Optional[int]]:
+	mtimes = {}
+	for path in paths:
+		try:
+			mtimes[path] = path.stat().st_mtime_ns
+		except FileNotFoundError:
+			mtimes[path] = None
+	return mtimes
+
+
+# the names of the files which were added, deleted or modified
+def changed_names(old_mtimes: dict[str, int], new_mtimes: dict[str, int]) -> set[str]:
+	return {name for name in old_mtimes.keys() | new_mtimes.keys() if old_mtimes.get(name) != new_mtimes.get(name)}
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import concurrent.futures
+import dataclasses
+import os
+import pathlib
+import threading
+import time
+import typing
+
+
+# the file was modified since it was read, so writing it would undo that change
+class FileChangedError(Exception):
+	pass
+
+
+# write the contents with the given newlines, to a temporary file which replaces the file so it's never left half-written,
+# if `expected_mtime` is given the file is only replaced if it still has this modification time,
+# returns the number of bytes written
+def write_file(path: pathlib.Path, contents: str, newline: str = '\n', expected_mtime: typing.Optional[int] = None) -> int:
+	data = contents.replace('\n', newline).encode('utf8')
+	# write to the target of a symlink, replacing the symlink would turn it into a copy
+	path = path.resolve()
+	temp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+	try:
+		with temp_path.open('wb') as f:
+			f.write(data)
+		# keep the permissions of the original file
+		if path.exists():
+			os.chmod(temp_path, path.stat().st_mode)
+		# checked right before replacing the file, to leave as little time as possible for another change
+		if expected_mtime is not None and path.stat().st_mtime_ns != expected_mtime:
+			raise FileChangedError('modified since it was read, not written')
+		os.replace(temp_path, path)
+	except BaseException:
+		temp_path.unlink(missing_ok=True)
+		raise
+	return len(data)
+
+
+# writes files in a pool of threads so the writing phase doesn't wait for each write,
+# the failures are collected to be reported together when it's closed
+@dataclasses.dataclass
+class FileWriter:
+	jobs: int = 4
+	# the modification times which the files must still have to be written, see `write_file`
+	expected_mtimes: dict[pathlib.Path, int] = dataclasses.field(default_factory=dict)
+	# the modification times of the files right after they were written
+	written_mtimes: dict[pathlib.Path, int] = dataclasses.field(init=False, default_factory=dict)
+	files_written: int = dataclasses.field(init=False, default=0)
+	bytes_written: int = dataclasses.field(init=False, default=0)
+	# from the first write until all the writes finished
+	elapsed_time: float = dataclasses.field(init=False, default=0)
+	failures: dict[pathlib.Path, Exception] = dataclasses.field(init=False, default_factory=dict)
+
+	def __post_init__(self) -> None:
+		self._executor = concurrent.futures.ThreadPoolExecutor(self.jobs, thread_name_prefix='writer')
+		# limit the contents waiting to be written, so they don't pile up in memory when writing is slow
+		self._pending = threading.BoundedSemaphore(self.jobs * 2)
+		self._lock = threading.Lock()
+		self._start_time = None
+
+	def __enter__(self) -> FileWriter:
+		return self
+
+	def __exit__(self, *exc_info) -> None:
+		self.close()
+
+	def write(self, path: pathlib.Path, contents: str, newline: str = '\n') -> None:
+		if self._start_time is None:
+			self._start_time = time.perf_counter()
+		self._pending.acquire()
+		future = self._executor.submit(self._write, path, contents, newline)
+		future.add_done_callback(lambda _: self._pending.release())
+
+	def _write(self, path: pathlib.Path, contents: str, newline: str) -> None:
+		try:
+			size = write_file(path, contents, newline, self.expected_mtimes.get(path))
+			mtime = path.stat().st_mtime_ns
+		except Exception as e:
+			with self._lock:
+				self.failures[path] = e
+			return
+		with self._lock:
+			self.files_written += 1
+			self.bytes_written += size
+			self.written_mtimes[path] = mtime
+
+	# wait for all the writes to finish
+	def close(self) -> None:
+		self._executor.shutdown(wait=True)
+		if self._start_time is not None:
+			self.elapsed_time = time.perf_counter() - self._start_time
+
+	@property
+	def throughput(self) -> typing.Optional[float]:
+		if not self.elapsed_time:
+			return None
+		return self.bytes_written / self.elapsed_time